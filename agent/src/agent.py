@@ -3,13 +3,17 @@ from dotenv import load_dotenv
 import asyncio
 import json
 import os
+import time
+from dataclasses import asdict
 
 from livekit.agents import (
     Agent,
     AgentSession,
     JobContext,
     JobProcess,
+    MetricsCollectedEvent,
     RoomInputOptions,
+    UserInputTranscribedEvent,
     WorkerOptions,
     cli,
     inference,
@@ -22,6 +26,16 @@ from logging_config import setup_logging
 
 from services.kb_service import KnowledgeBaseService
 from services.help_service import HelpRequestService
+from services.answer_router import SupervisorAnswerRouter
+from services.answer_cache import KBAnswerCache
+from services.speculative_kb import SpeculativeKBSearch
+from services.tenants import CallContext, TenantDirectory, TenantNotFound
+from frontdesk_shared.metrics import span
+from frontdesk_shared.request_events import add_request_event
+from services.metrics import TOOL_PHASE_SECONDS, TurnLatencyTracker, record_pool_stats, start_metrics_server
+from services.warmup import FirstAnswerTimer, KBPrewarmer
+from services.async_db import close_async_pool, get_async_pool
+from services.db import get_pool
 
 import redis.asyncio as aioredis
 
@@ -34,26 +48,75 @@ logger.setLevel(logging.INFO)
 REDIS_URL = os.getenv("REDIS_URL")
 redis = aioredis.from_url(REDIS_URL, decode_responses=True)
 SUPERVISOR_CHANNEL = "supervisor_answers"
+KB_UPDATES_CHANNEL = "kb_updates"
 
 
 # Business Services 
-# Hardcoding business id for dev 
-BUSINESS_ID = 1
-BUSINESS_NAME= "Blossoms and Roots Salon" # hardcoded 
+# one worker serves every business, each job resolves its own (see services/tenants.py)
+tenants = TenantDirectory()
 kb_service = KnowledgeBaseService()
 help_service = HelpRequestService()
 
+# KB lookups per normalized question, shared with the other workers through Redis
+answer_cache = KBAnswerCache(redis)
+
+# per-request answer delivery, shared by every session in this worker process
+answer_router = SupervisorAnswerRouter(redis, SUPERVISOR_CHANNEL)
+
+# one KB update listener per worker process, shared by every session in it
+kb_listener_task = None
+kb_listener_ready = asyncio.Event()
+
+kb_prewarmer = KBPrewarmer(kb_service, REDIS_URL)
+
+# fire-and-forget tasks (warmups, session cleanup), referenced until done
+background_tasks = set()
+
 
 # Prewarm
+# runs in each job process before it is assigned a call, outside the job's
+# event loop: only sync work here (VAD, DB pool, KB indexes of likely tenants)
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    try:
+        get_pool().fill()
+    except Exception as e:
+        # the first query connects instead
+        logger.warning(f"DB pool prewarm failed: {e}")
+    kb_prewarmer.prewarm()
+    record_pool_stats("sync", get_pool().stats())
+
+
+# Job start: what needs the job's event loop, done while the caller connects
+async def warm_job():
+    ensure_kb_listener()
+    answer_router.ensure_started()
+
+    async def warm_pool():
+        pool = await get_async_pool()
+        await pool.wait(timeout=5)
+
+    results = await asyncio.gather(
+        warm_pool(),
+        redis.ping(),
+        asyncio.wait_for(kb_listener_ready.wait(), timeout=5),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            # the call goes ahead, these reconnect on first use
+            logger.warning(f"Job warmup incomplete: {result!r}")
+
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 
 # Agent Definition
-class ReceptionistAgent(Agent):
-    def __init__(self) -> None:
-        super().__init__(
-            instructions=f"""You are a professional receptionist assistant for a business named {BUSINESS_NAME}.
+INSTRUCTIONS = """You are a professional receptionist assistant for a business named {business_name}.
 Your responsibilities:
 1. Answer caller questions using the knowledge base
 2. If information isn't available, create a help request and assure the caller to wait while you get their answer
@@ -61,13 +124,39 @@ Your responsibilities:
 4. Never make up information - only use what's provided by the lookup_information function
 5: Avoid answering questions that are not related to a business
 Keep responses natural and conversational without complex formatting or emojis"""
-        )
+
+
+class ReceptionistAgent(Agent):
+    def __init__(self, call: CallContext, first_answer: FirstAnswerTimer) -> None:
+        tenant = call.tenant
+        instructions = INSTRUCTIONS.format(business_name=tenant.name)
+        if tenant.agent_instructions:
+            instructions += f"\n{tenant.agent_instructions}"
+
+        super().__init__(instructions=instructions)
+        self.call = call
+        self.first_answer = first_answer
+        self.business_id = tenant.business_id
+        # resolved on the first help request
+        self._customer_id = None
+        # help requests this caller is still waiting on
+        self._waiting_requests = set()
+        # KB searches on the caller's interim transcripts, opt-in (KB_SPECULATIVE)
+        self.speculative = SpeculativeKBSearch(self._search_kb, kb_service.rescore)
 
     @function_tool
     async def lookup_information(self, question: str):
+        start = time.perf_counter()
+        with span(TOOL_PHASE_SECONDS, tool="lookup_information", phase="total"):
+            result = await self._lookup_information(question)
+        self.first_answer.lookup_done(time.perf_counter() - start)
+        return result
+
+    async def _lookup_information(self, question: str):
 
         #get KB in memory and rank results return if matches found
-        kb_result = kb_service.search(BUSINESS_ID, question)
+        with span(TOOL_PHASE_SECONDS, tool="lookup_information", phase="kb_search"):
+            kb_result = await self.speculative.take(question) or await self._search_kb(question)
         logger.info(f"kb_result: {kb_result}")
 
         if kb_result.hit and kb_result.matches:
@@ -76,8 +165,21 @@ Keep responses natural and conversational without complex formatting or emojis""
         
 
         try:
-            help_request = help_service.create_request(question, BUSINESS_ID, 1)
-            logger.info(f"Created help request: {help_request.id}")
+            with span(TOOL_PHASE_SECONDS, tool="lookup_information", phase="create_request"):
+                if self._customer_id is None:
+                    self._customer_id = await tenants.customer_id(self.call.caller_number)
+                help_request = await help_service.create_request_async(question, self.business_id, self._customer_id)
+
+            # an identical open question is already on the dashboard, its
+            # answer fans out to every caller waiting on it
+            if not help_request.coalesced:
+                with span(TOOL_PHASE_SECONDS, tool="lookup_information", phase="publish"):
+                    await publish_request_event("created", help_request)
+
+            if help_request.id not in self._waiting_requests:
+                self._waiting_requests.add(help_request.id)
+                with span(TOOL_PHASE_SECONDS, tool="lookup_information", phase="register"):
+                    await answer_router.register(help_request.id, self.deliver_supervisor_answer)
 
             return (
                 "I don't have that information right now. "
@@ -88,67 +190,133 @@ Keep responses natural and conversational without complex formatting or emojis""
             return "I couldn't create a help request. Please try again later."
 
 
-# Redis Listener Background Task
-async def listen_for_supervisor_updates(agent_session: AgentSession):
-    pubsub = redis.pubsub()
-    await pubsub.subscribe(SUPERVISOR_CHANNEL)
-
-    logger.info("\n--------------------------\n"
-                "Subscribed to Redis channel\n"
-                "--------------------------")
-
-    async for message in pubsub.listen():
+    async def _search_kb(self, query: str):
+        return await answer_cache.lookup(
+            self.business_id, query, lambda: kb_service.search_async(self.business_id, query)
+        )
 
-        if message["type"] != "message":
-            continue
+    async def deliver_supervisor_answer(self, data: dict):
+        self._waiting_requests.discard(data.get("request_id"))
 
-        raw = message["data"]
+        logger.info("\n================ SUPERVISOR UPDATE ================\n"
+                    f"{json.dumps(data, indent=2)}\n"
+                    "===================================================")
 
-        # Decode bytes → string
-        if isinstance(raw, bytes):
-            raw = raw.decode("utf-8", errors="ignore").strip()
+        if data.get("type") == "timed_out":
+            await self.session.generate_reply(
+                instructions=(
+                    f"Apologize to the caller that the team could not get back in time about: '{data.get('question')}'. "
+                    "Let them know someone from the team will follow up with them later, and ask if there is anything else you can help with"
+                )
+            )
+            return
 
-        # Skip noise from Redis
-        if raw in ["1", "2", "subscribe", "unsubscribe", "message", ""]:
-            logger.info(f"Ignoring non-JSON payload: {raw!r}")
-            continue
+        await self.session.generate_reply(
+            instructions=(
+                f"Tell the caller that you have the data they requested for rephrasing the question they asked: '{data.get('question')}'. "
+                f"{data.get('answer')}. "
+                "Frame the reply as someone from the team letting the user know about the data they requested"
+            )
+        )
 
-        # Try loading JSON safely
+    async def stop_waiting(self):
+        # caller hung up, nobody to deliver pending answers to
+        for request_id in list(self._waiting_requests):
+            await answer_router.unregister(request_id, self.deliver_supervisor_answer)
+        self._waiting_requests.clear()
+        self.speculative.cancel()
+        logger.info(f"Supervisor answer delivery: {answer_router.snapshot()}")
+        logger.info(f"KB answer cache: {answer_cache.snapshot()}")
+        logger.info(f"Speculative KB search: {self.speculative.snapshot()}")
+        pool_stats = get_pool().stats()
+        record_pool_stats("sync", pool_stats)
+        logger.info(f"DB pool: {asdict(pool_stats)}")
+
+
+# Pushes help request changes to the supervisor dashboard
+async def publish_request_event(event_type: str, help_request):
+    try:
+        await add_request_event(redis, event_type, asdict(help_request))
+    except Exception as e:
+        # the dashboard falls back to its next fetch, the caller is not affected
+        logger.error(f"Failed to publish help request event: {e}")
+
+
+# KB Change Listener
+async def listen_for_kb_updates():
+    while True:
+        pubsub = redis.pubsub()
         try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            logger.error("\n------------------------------\n"
-                         f"⚠️ Invalid JSON received:\n{raw}\n"
-                         "------------------------------")
-            continue
+            await pubsub.subscribe(KB_UPDATES_CHANNEL)
+
+            # anything published while we were not subscribed is lost, so
+            # resident indexes are dropped and lazily reloaded from the DB.
+            # The first time only the prewarmed ones that changed since.
+            if kb_listener_ready.is_set():
+                kb_service.invalidate_all()
+            else:
+                await kb_prewarmer.revalidate(redis)
+            answer_cache.reset()
+            kb_listener_ready.set()
+            logger.info("Subscribed to KB updates channel")
+
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+
+                try:
+                    event = json.loads(message["data"])
+                except json.JSONDecodeError:
+                    logger.error(f"Invalid KB update received: {message['data']!r}")
+                    continue
+
+                if isinstance(event, dict):
+                    kb_service.apply_update(event)
+                    answer_cache.note_version(int(event.get("business_id", -1)), event.get("version"))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"KB update listener error: {e}", exc_info=True)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
 
-        logger.info("\n================ SUPERVISOR UPDATE ================\n"
-                    f"{json.dumps(data, indent=2)}\n"
-                    "===================================================")
 
-        # Ensure it's actually a dict
-        if not isinstance(data, dict):
-            logger.error(f"Received non-dict JSON: {data}")
-            continue
-
-        # Business ID filter
-    
-        if int(data.get("business_id", -1)) != BUSINESS_ID:
-            continue
-
-        await agent_session.generate_reply(
-        instructions=(
-            f"Tell the caller that you have the data they requested for rephrasing the question they asked: '{data.get('question')}'. "
-            f"{data.get('answer')}. "
-            "Frame the reply as someone from the team letting the user know about the data they requested"
-        )
-)
+def ensure_kb_listener():
+    global kb_listener_task
+    if kb_listener_task is None or kb_listener_task.done():
+        kb_listener_task = asyncio.create_task(listen_for_kb_updates())
+
 
 # entrypoint
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {"room": ctx.room.name}
+    ctx.add_shutdown_callback(close_async_pool)
+    first_answer = FirstAnswerTimer()
+
+    # connections and the KB subscription warm up while the caller connects
+    warmup = run_in_background(warm_job())
+
+    # the business comes from the dispatch / room metadata or the number the
+    # caller dialed, both known once the caller joined
+    await ctx.connect()
+    participant = await ctx.wait_for_participant()
+    await warmup
+    try:
+        call = await tenants.resolve(ctx.job.metadata, ctx.room.metadata, participant.attributes)
+    except TenantNotFound as e:
+        logger.error(f"Can't take call: {e}")
+        ctx.shutdown(reason="unknown business")
+        return
+
+    ctx.log_context_fields = {"room": ctx.room.name, "business_id": call.tenant.business_id}
 
-    agent = ReceptionistAgent()
+    # no-op when prewarmed, otherwise loads during the greeting; a lookup
+    # arriving earlier waits for this same load
+    run_in_background(kb_service.warm_async(call.tenant.business_id))
+
+    agent = ReceptionistAgent(call, first_answer)
 
     session = AgentSession(
         stt=inference.STT(model="cartesia/ink-whisper", language="en"),
@@ -159,13 +327,28 @@ async def entrypoint(ctx: JobContext):
         preemptive_generation=False,
     )
 
-    asyncio.create_task(listen_for_supervisor_updates(session))
+    # STT / end of turn / LLM / TTS timings of every turn
+    turn_latency = TurnLatencyTracker()
+
+    @session.on("metrics_collected")
+    def _on_metrics_collected(ev: MetricsCollectedEvent):
+        turn_latency.collect(ev.metrics)
+
+    # KB search starts on interim transcripts, before the LLM asks for it
+    @session.on("user_input_transcribed")
+    def _on_user_input_transcribed(ev: UserInputTranscribedEvent):
+        agent.speculative.on_transcript(ev.transcript, ev.is_final)
+
+    @session.on("close")
+    def _on_close(_):
+        run_in_background(agent.stop_waiting())
 
     await session.start(
         agent=agent,
         room=ctx.room,
         room_input_options=RoomInputOptions(noise_cancellation=noise_cancellation.BVC()),
     )
+    first_answer.ready()
 
     await session.generate_reply(
         instructions="Greet the caller warmly and ask how you can help them today."
@@ -174,6 +357,8 @@ async def entrypoint(ctx: JobContext):
 
 # Main
 if __name__ == "__main__":
+    # job processes record, this (main) worker process serves /metrics
+    start_metrics_server()
     cli.run_app(
         WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm)
     )
@@ -0,0 +1,527 @@
+"""
+KB retrieval benchmark.
+
+Generates a synthetic KB per size (one business, N articles) and a query
+workload against it, then measures the search path:
+
+- index:     the resident index ranking (KnowledgeBaseService._search_index)
+             and search_many, no database involved
+- postgres:  the same corpus written to kb_article of a throw-away business,
+             timing the cold index load and KB_PREFILTER searches (needs DB_URL),
+             then a parity check of KB_PREFILTER against the resident index
+             on plurals, partial words and paraphrases
+
+Per size it reports p50/p95/p99 latency, throughput, index build time and
+memory, and the accuracy of the results (answerable queries that hit, and
+hit the right article first; unanswerable ones that wrongly hit).
+
+    cd agent/src
+    python -m benchmarks.kb_retrieval                          # 100 .. 100k, index only
+    python -m benchmarks.kb_retrieval --postgres --sizes 100,10000
+    python -m benchmarks.kb_retrieval --save-baseline          # writes benchmarks/baseline.json
+    python -m benchmarks.kb_retrieval --check                  # exit 1 on a regression
+
+Latencies depend on the machine, re-save the baseline where --check runs.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.kb_service import KBResult, KnowledgeBaseService
+
+logger = logging.getLogger("kb_benchmark")
+
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_QUERIES = 400
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# allowed slowdown against the baseline, and an absolute floor so
+# sub-millisecond jitter is not reported
+LATENCY_TOLERANCE = 0.5
+LATENCY_FLOOR_MS = 0.2
+ACCURACY_TOLERANCE = 0.005
+
+PERCENTILES = (50, 95, 99)
+
+BENCHMARK_BUSINESS_PREFIX = "kb-benchmark-"
+
+# ---- Synthetic corpus ----
+
+SERVICES = [
+    "haircut", "balayage", "highlights", "blowout", "keratin treatment", "beard trim",
+    "manicure", "pedicure", "gel nails", "acrylic nails", "eyebrow wax", "eyelash extensions",
+    "facial", "microdermabrasion", "chemical peel", "deep tissue massage", "hot stone massage",
+    "bridal makeup", "hair coloring", "perm", "hair extensions", "scalp treatment",
+    "kids haircut", "root touch up", "deep conditioning", "updo styling", "spray tan",
+    "body scrub", "lash lift", "brow tint",
+]
+
+ASPECTS = [
+    "price", "duration", "availability on saturdays", "availability on sundays",
+    "cancellation policy", "deposit", "aftercare", "gift cards", "group booking",
+    "walk in appointments", "student discount", "senior discount", "parking",
+    "wheelchair access", "consultation", "patch test", "loyalty points",
+    "late arrival policy", "refund policy", "payment methods",
+]
+
+OPENERS = [
+    "what is the", "tell me about the", "can you explain the", "i want to know the",
+    "do you have info on the", "question about the",
+]
+
+# unrelated to anything in the corpus, these should not hit
+OFF_TOPIC = [
+    "weather", "football", "mortgage", "volcano", "submarine", "astronomy", "lottery",
+    "taxes", "election", "recipe", "pottery", "skydiving", "chess", "bitcoin", "hiking",
+    "plumbing", "karaoke", "origami", "telescope", "zoo",
+]
+
+_SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "val", "sen", "dri", "mar", "bel", "quo", "zin", "pa", "ny", "ost"]
+
+
+def _branches(count: int, rng: random.Random) -> List[str]:
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(_SYLLABLES) for _ in range(3)))
+    return sorted(names)
+
+
+@dataclass
+class Article:
+    id: str
+    question: str
+    answer: str
+    category: str
+    # question parts, for paraphrased queries
+    service: str
+    aspect: str
+    branch: str
+
+
+@dataclass
+class Query:
+    text: str
+    kind: str
+    # question of the article that should rank first, None when unanswerable
+    expected: Optional[str]
+
+
+def generate_corpus(size: int, seed: int = 0) -> List[Article]:
+    rng = random.Random(seed)
+    combos_per_branch = len(SERVICES) * len(ASPECTS)
+    branches = _branches(max(1, math.ceil(size / combos_per_branch)), rng)
+
+    combos = [(s, a, b) for b in branches for s in SERVICES for a in ASPECTS]
+    rng.shuffle(combos)
+
+    articles = []
+    for i, (service, aspect, branch) in enumerate(combos[:size]):
+        articles.append(Article(
+            id=f"00000000-0000-4000-8000-{i:012d}",
+            question=f"{rng.choice(OPENERS)} {aspect} for {service} at the {branch} location?",
+            answer=f"The {aspect} for {service} at our {branch} location is listed on the booking page.",
+            category=service,
+            service=service,
+            aspect=aspect,
+            branch=branch,
+        ))
+    return articles
+
+
+def generate_queries(articles: List[Article], count: int = DEFAULT_QUERIES, seed: int = 1) -> List[Query]:
+    """A quarter verbatim questions, half paraphrases, a quarter unanswerable."""
+    rng = random.Random(seed)
+    queries = []
+
+    for _ in range(count // 4):
+        article = rng.choice(articles)
+        queries.append(Query(article.question, "exact", article.question))
+
+    for _ in range(count // 2):
+        article = rng.choice(articles)
+        parts = [article.service, article.aspect, article.branch]
+        rng.shuffle(parts)
+        queries.append(Query(f"hi, {' '.join(parts)} please", "paraphrase", article.question))
+
+    while len(queries) < count:
+        words = rng.sample(OFF_TOPIC, 3)
+        # no word shared with the corpus, not even the filler
+        queries.append(Query(f"hey, {' '.join(words)}?", "miss", None))
+
+    rng.shuffle(queries)
+    return queries
+
+
+def _rows(articles: List[Article]) -> List[dict]:
+    # shaped like the KB_ARTICLES_SQL rows the service loads
+    return [
+        {
+            "id": article.id,
+            "title": article.question,
+            "content": {"canonical_question": article.question, "answer": article.answer, "category": article.category},
+            "embedding": None,
+            "embedding_model": None,
+        }
+        for article in articles
+    ]
+
+# ---- Measurement ----
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _latency_stats(latencies_ms: List[float]) -> dict:
+    values = sorted(latencies_ms)
+    total_s = sum(values) / 1000
+    return {
+        **{f"p{p}_ms": round(_percentile(values, p), 4) for p in PERCENTILES},
+        "mean_ms": round(sum(values) / len(values), 4) if values else 0.0,
+        "qps": round(len(values) / total_s, 1) if total_s else 0.0,
+    }
+
+
+def _accuracy(queries: List[Query], results: List[KBResult]) -> dict:
+    answerable = [(q, r) for q, r in zip(queries, results) if q.expected is not None]
+    unanswerable = [r for q, r in zip(queries, results) if q.expected is None]
+
+    hits = sum(1 for _, r in answerable if r.hit)
+    top1 = sum(1 for q, r in answerable if r.matches and r.matches[0].question == q.expected)
+    top3 = sum(1 for q, r in answerable if any(m.question == q.expected for m in r.matches[:3]))
+    false_hits = sum(1 for r in unanswerable if r.hit)
+
+    return {
+        "hit_rate": round(hits / len(answerable), 4) if answerable else 0.0,
+        "top1_accuracy": round(top1 / len(answerable), 4) if answerable else 0.0,
+        "top3_recall": round(top3 / len(answerable), 4) if answerable else 0.0,
+        "false_hit_rate": round(false_hits / len(unanswerable), 4) if unanswerable else 0.0,
+    }
+
+
+def _timed_searches(search, queries: List[Query], repeat: int) -> tuple:
+    # the workload runs `repeat` times, each query counts with its median
+    timings: List[List[float]] = [[] for _ in queries]
+    results = []
+    for _ in range(repeat):
+        results = []
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            results.append(search(query.text))
+            timings[i].append((time.perf_counter() - start) * 1000)
+    return [sorted(t)[len(t) // 2] for t in timings], results
+
+
+def bench_index(size: int, queries_count: int, seed: int, repeat: int = 3) -> dict:
+    articles = generate_corpus(size, seed)
+    queries = generate_queries(articles, queries_count, seed + 1)
+    rows = _rows(articles)
+    service = KnowledgeBaseService(retrieval_mode="lexical", prefilter=False)
+
+    gc.collect()
+    start = time.perf_counter()
+    index = service._build_index(0, rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # second build under tracemalloc, tracing slows the timed one down
+    del index
+    gc.collect()
+    tracemalloc.start()
+    index = service._build_index(0, rows)
+    index_bytes, build_peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # one untimed pass, builds the lazy substring corpus
+    for query in queries[:10]:
+        service._search_index(index, query.text, 3)
+
+    latencies, results = _timed_searches(lambda q: service._search_index(index, q, 3), queries, repeat)
+
+    start = time.perf_counter()
+    batch_results = service._rank_many([q.text for q in queries], index, 3)
+    batch_s = time.perf_counter() - start
+
+    if [r.matches for r in batch_results] != [r.matches for r in results]:
+        logger.warning(f"search_many and search disagree at {size} articles")
+
+    return {
+        **_latency_stats(latencies),
+        "batch_qps": round(len(queries) / batch_s, 1) if batch_s else 0.0,
+        "build_ms": round(build_ms, 1),
+        "index_mb": round(index_bytes / 2**20, 2),
+        "build_peak_mb": round(build_peak_bytes / 2**20, 2),
+        **_accuracy(queries, results),
+    }
+
+# ---- Postgres ----
+
+
+def _seed_business(articles: List[Article]) -> int:
+    from psycopg2.extras import Json, execute_values
+    from services.db import get_db
+
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO business (name, created_at) VALUES (%s, now()) RETURNING id",
+            (f"{BENCHMARK_BUSINESS_PREFIX}{len(articles)}",),
+        )
+        business_id = cur.fetchone()["id"]
+
+        created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        execute_values(
+            cur,
+            "INSERT INTO kb_article (business_id, title, content, enrichment_status, created_at) VALUES %s",
+            [
+                (
+                    business_id,
+                    article.question,
+                    Json({"canonical_question": article.question, "answer": article.answer, "category": article.category}),
+                    "done",
+                    # distinct, the index keeps articles in created_at order
+                    created_at + timedelta(milliseconds=i),
+                )
+                for i, article in enumerate(articles)
+            ],
+            page_size=1000,
+        )
+        conn.commit()
+        # fresh statistics, and the GIN pending list merged, as in a settled
+        # production table
+        conn.autocommit = True
+        cur.execute("VACUUM ANALYZE kb_article")
+        conn.autocommit = False
+
+    return business_id
+
+
+def _drop_businesses(business_id: Optional[int] = None) -> None:
+    """Drops one seeded business, or all of them (left over by an interrupted run)."""
+    from services.db import get_db
+
+    if business_id is None:
+        where, params = "name LIKE %s", (f"{BENCHMARK_BUSINESS_PREFIX}%",)
+    else:
+        where, params = "id = %s", (business_id,)
+
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM kb_article WHERE business_id IN (SELECT id FROM business WHERE {where})", params)
+        cur.execute(f"DELETE FROM business WHERE {where}", params)
+        conn.commit()
+
+
+def bench_postgres(size: int, queries_count: int, seed: int, repeat: int = 3, keep: bool = False) -> dict:
+    articles = generate_corpus(size, seed)
+    queries = generate_queries(articles, queries_count, seed + 1)
+
+    start = time.perf_counter()
+    business_id = _seed_business(articles)
+    seed_s = time.perf_counter() - start
+
+    try:
+        resident = KnowledgeBaseService(retrieval_mode="lexical", prefilter=False)
+        start = time.perf_counter()
+        resident.search(business_id, queries[0].text)
+        cold_load_ms = (time.perf_counter() - start) * 1000
+
+        prefilter = KnowledgeBaseService(retrieval_mode="lexical", prefilter=True)
+        # warms the pooled connection
+        prefilter.search(business_id, queries[0].text)
+        latencies, results = _timed_searches(lambda q: prefilter.search(business_id, q), queries, repeat)
+
+        errors = [r.error for r in results if r.error]
+        if errors:
+            raise RuntimeError(f"prefilter search failed: {errors[0]}")
+
+        return {
+            **_latency_stats(latencies),
+            "cold_load_ms": round(cold_load_ms, 1),
+            "seed_s": round(seed_s, 2),
+            **_accuracy(queries, results),
+        }
+    finally:
+        if not keep:
+            _drop_businesses(business_id)
+
+# ---- Prefilter parity ----
+
+# plurals, partial words and paraphrases the synthetic corpus (exact,
+# repeated words) never exercises
+PARITY_QUESTIONS = [
+    "prices for coloring",
+    "Do you take walk-ins?",
+    "What are your opening hours on weekends?",
+    "Is parking available?",
+    "How much is a haircut for kids",
+    "Can I cancel my appointment",
+    "who",
+]
+
+PARITY_QUERIES = [
+    "price", "prices", "coloring price", "color", "walk in", "walk-ins", "opening hour",
+    "weekend hours", "parking", "is there parking nearby", "kids haircuts", "haircut",
+    "cancel", "cancellation", "appointments", "how much", "who", "who do i talk to",
+    "the", "hey, volcano submarine?",
+]
+
+
+def check_prefilter_parity() -> List[str]:
+    """KB_PREFILTER results that differ from the resident index on PARITY_QUERIES."""
+    articles = [
+        Article(id=f"00000000-0000-4000-9000-{i:012d}", question=question, answer=f"answer {i}",
+                category="parity", service="", aspect="", branch="")
+        for i, question in enumerate(PARITY_QUESTIONS)
+    ]
+    business_id = _seed_business(articles)
+
+    try:
+        resident = KnowledgeBaseService(retrieval_mode="lexical", prefilter=False)
+        prefilter = KnowledgeBaseService(retrieval_mode="lexical", prefilter=True)
+
+        problems = []
+        for query in PARITY_QUERIES:
+            expected = resident.search(business_id, query)
+            got = prefilter.search(business_id, query)
+            expected_top = [(m.question, round(m.score, 6)) for m in expected.matches[:1]]
+            got_top = [(m.question, round(m.score, 6)) for m in got.matches[:1]]
+            if expected.hit != got.hit or expected_top != got_top:
+                problems.append(f"parity/{query!r}: prefilter {got_top or 'miss'}, resident {expected_top or 'miss'}")
+        return problems
+    finally:
+        _drop_businesses(business_id)
+
+# ---- Baseline ----
+
+# p99 is reported but not gated, a few hundred queries make it too noisy
+LATENCY_KEYS = ("p50_ms", "p95_ms")
+ACCURACY_KEYS = ("hit_rate", "top1_accuracy", "top3_recall")
+
+
+def compare(baseline: dict, current: dict, tolerance: float = LATENCY_TOLERANCE) -> List[str]:
+    """Regressions of current against the baseline, as readable lines."""
+    problems = []
+    for mode, sizes in current.items():
+        for size, metrics in sizes.items():
+            base = baseline.get(mode, {}).get(size)
+            if base is None:
+                continue
+
+            for key in LATENCY_KEYS:
+                if key not in base:
+                    continue
+                limit = max(base[key] * (1 + tolerance), base[key] + LATENCY_FLOOR_MS)
+                if metrics[key] > limit:
+                    problems.append(f"{mode}/{size}: {key} {metrics[key]:.3f}ms > {limit:.3f}ms (baseline {base[key]:.3f}ms)")
+
+            for key in ACCURACY_KEYS:
+                if key in base and metrics[key] < base[key] - ACCURACY_TOLERANCE:
+                    problems.append(f"{mode}/{size}: {key} {metrics[key]:.4f} < baseline {base[key]:.4f}")
+
+            if "false_hit_rate" in base and metrics["false_hit_rate"] > base["false_hit_rate"] + ACCURACY_TOLERANCE:
+                problems.append(
+                    f"{mode}/{size}: false_hit_rate {metrics['false_hit_rate']:.4f} > baseline {base['false_hit_rate']:.4f}"
+                )
+    return problems
+
+
+def _print_table(mode: str, results: Dict[str, dict]) -> None:
+    columns = ["size", "p50_ms", "p95_ms", "p99_ms", "qps", "batch_qps", "build_ms", "cold_load_ms",
+               "index_mb", "hit_rate", "top1_accuracy", "false_hit_rate"]
+    columns = [c for c in columns if c == "size" or any(c in m for m in results.values())]
+
+    print(f"\n{mode}")
+    print("  ".join(f"{c:>14}" for c in columns))
+    for size, metrics in results.items():
+        print("  ".join(f"{size if c == 'size' else metrics.get(c, ''):>14}" for c in columns))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark KB retrieval latency and accuracy")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma separated article counts")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the workload per size")
+    parser.add_argument("--postgres", action="store_true", help="also run against DB_URL")
+    parser.add_argument("--no-index", action="store_true", help="skip the in-memory runs")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded businesses")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=LATENCY_TOLERANCE,
+                        help="allowed latency increase, 0.5 = 50%%")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s | %(name)s | %(message)s")
+    # the service logs every match list at INFO
+    logging.getLogger("kb_service").setLevel(logging.WARNING)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results: Dict[str, Dict[str, dict]] = {}
+    parity_problems: List[str] = []
+
+    if not args.no_index:
+        results["index"] = {str(size): bench_index(size, args.queries, args.seed, args.repeat) for size in sizes}
+
+    if args.postgres:
+        if not os.getenv("DB_URL"):
+            parser.error("--postgres needs DB_URL")
+        # their rows would show up in every prefilter query
+        _drop_businesses()
+        results["postgres"] = {str(size): bench_postgres(size, args.queries, args.seed, args.repeat, args.keep) for size in sizes}
+        parity_problems = check_prefilter_parity()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode, by_size in results.items():
+            _print_table(mode, by_size)
+
+    if parity_problems:
+        print("\nKB_PREFILTER results differing from the resident index:")
+        for problem in parity_problems:
+            print(f"  {problem}")
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        for mode, by_size in results.items():
+            baseline.setdefault(mode, {}).update(by_size)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            print(f"\nNo baseline at {args.baseline}, run with --save-baseline first")
+            return 1
+        problems = compare(json.loads(args.baseline.read_text()), results, args.tolerance) + parity_problems
+        if problems:
+            print("\nRegressions:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print("\nNo regressions against the baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
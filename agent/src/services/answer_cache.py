@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .help_service import normalize_question
+from .kb_service import KBMatch, KBResult
+from .metrics import KB_CACHE_LOOKUPS
+
+logger = logging.getLogger("answer_cache")
+
+
+# matches KB_VERSION_KEY on the backend (app/services/kb_events.py)
+KB_VERSION_KEY = "kb_version"
+ANSWER_CACHE_PREFIX = "kb_answer"
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    shared_hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    errors: int = 0
+
+
+class KBAnswerCache:
+    """
+    Caches KB lookups per business and normalized question, so callers
+    asking the same thing skip the ranking (and, in prefilter mode, the
+    database).
+
+    - entries live in a small per-process LRU and in Redis, shared by every
+      worker; both expire after KB_CACHE_TTL seconds
+    - misses are cached too, for KB_CACHE_NEGATIVE_TTL seconds
+    - keys include the business' KB version, bumped by the backend on every
+      KB change, so an update makes the old entries unreachable right away
+    """
+
+    def __init__(
+        self,
+        redis,
+        ttl: Optional[int] = None,
+        negative_ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.redis = redis
+        self.ttl = ttl if ttl is not None else int(os.getenv("KB_CACHE_TTL", "300"))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else int(os.getenv("KB_CACHE_NEGATIVE_TTL", "60"))
+        self.max_entries = max_entries or int(os.getenv("KB_CACHE_MAX_ENTRIES", "1024"))
+
+        # (business_id, version, normalized question) -> (expires_at, result)
+        self._entries: "OrderedDict[Tuple[int, str, str], Tuple[float, KBResult]]" = OrderedDict()
+        self._versions: Dict[int, str] = {}
+
+        self.stats = CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def lookup(
+        self,
+        business_id: int,
+        query: str,
+        search: Callable[[], Awaitable[KBResult]],
+    ) -> KBResult:
+        if not self.enabled:
+            return await search()
+
+        normalized = normalize_question(query)
+        # taken before searching, a result computed while an update comes in
+        # is stored under the old version and never served after it
+        version = await self._version(business_id)
+        if version is None:
+            self.stats.misses += 1
+            KB_CACHE_LOOKUPS.labels(result="miss").inc()
+            return await search()
+        key = (business_id, version, normalized)
+
+        result = self._get_local(key)
+        if result is not None:
+            self.stats.local_hits += 1
+            KB_CACHE_LOOKUPS.labels(result="local_hit").inc()
+            return self._counted(result)
+
+        result = await self._get_shared(key)
+        if result is not None:
+            self.stats.shared_hits += 1
+            KB_CACHE_LOOKUPS.labels(result="shared_hit").inc()
+            self._put_local(key, result)
+            return self._counted(result)
+
+        self.stats.misses += 1
+        KB_CACHE_LOOKUPS.labels(result="miss").inc()
+        result = await search()
+        if result.error is None:
+            self._put_local(key, result)
+            await self._put_shared(key, result)
+        return result
+
+    def note_version(self, business_id: int, version: Optional[str]) -> None:
+        """Called for every kb_updates event, drops the business' local entries."""
+        if version is None:
+            # event from a backend that does not stamp versions yet
+            self._versions.pop(business_id, None)
+        else:
+            self._versions[business_id] = str(version)
+
+        for key in [k for k in self._entries if k[0] == business_id]:
+            del self._entries[key]
+
+    def reset(self) -> None:
+        # updates may have been missed, versions are fetched again
+        self._versions.clear()
+        self._entries.clear()
+
+    # ----------------- Storage -----------------
+
+    async def _version(self, business_id: int) -> Optional[str]:
+        version = self._versions.get(business_id)
+        if version is not None:
+            return version
+
+        try:
+            version = await self.redis.get(f"{KB_VERSION_KEY}:{business_id}") or "0"
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Reading KB version of business {business_id} failed: {e}")
+            # uncached lookups until Redis is back
+            return None
+
+        self._versions[business_id] = version
+        return version
+
+    def _redis_key(self, key: Tuple[int, str, str]) -> str:
+        business_id, version, normalized = key
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        return f"{ANSWER_CACHE_PREFIX}:{business_id}:{version}:{digest}"
+
+    def _ttl_for(self, result: KBResult) -> int:
+        return self.ttl if result.hit else min(self.negative_ttl, self.ttl)
+
+    def _get_local(self, key) -> Optional[KBResult]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        expires_at, result = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    def _put_local(self, key, result: KBResult) -> None:
+        ttl = self._ttl_for(result)
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_shared(self, key) -> Optional[KBResult]:
+        try:
+            data = await self.redis.get(self._redis_key(key))
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Reading cached KB answer failed: {e}")
+            return None
+
+        if data is None:
+            return None
+
+        try:
+            payload = json.loads(data)
+            return KBResult(
+                hit=payload["hit"],
+                matches=[KBMatch(**match) for match in payload["matches"]],
+            )
+        except (KeyError, TypeError, json.JSONDecodeError):
+            logger.error(f"Invalid cached KB answer {self._redis_key(key)}: {data!r}")
+            return None
+
+    async def _put_shared(self, key, result: KBResult) -> None:
+        ttl = self._ttl_for(result)
+        if ttl <= 0:
+            return
+
+        try:
+            await self.redis.set(self._redis_key(key), json.dumps(asdict(result)), ex=ttl)
+            self.stats.writes += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Caching KB answer failed: {e}")
+
+    def _counted(self, result: KBResult) -> KBResult:
+        if not result.hit:
+            self.stats.negative_hits += 1
+        return result
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        hits = stats.local_hits + stats.shared_hits
+        lookups = hits + stats.misses
+        return {
+            "entries": len(self._entries),
+            "lookups": lookups,
+            "local_hits": stats.local_hits,
+            "shared_hits": stats.shared_hits,
+            "negative_hits": stats.negative_hits,
+            "misses": stats.misses,
+            "writes": stats.writes,
+            "errors": stats.errors,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from redis.exceptions import ResponseError
+
+from .metrics import SUPERVISOR_ANSWER_LAG_SECONDS
+
+logger = logging.getLogger("answer_router")
+
+
+AnswerCallback = Callable[[dict], Awaitable[None]]
+
+# matches ANSWER_STREAM_RETENTION_SECONDS on the backend
+ANSWER_STREAM_RETENTION_SECONDS = int(os.getenv("ANSWER_STREAM_RETENTION_SECONDS", "86400"))
+
+
+@dataclass
+class DeliveryStats:
+    answers: int = 0
+    delivered: int = 0
+    replayed: int = 0
+    failed: int = 0
+    lag_total_ms: float = 0.0
+    lag_max_ms: float = 0.0
+    last_lag_ms: float = 0.0
+
+
+class SupervisorAnswerRouter:
+    """
+    Delivers supervisor answers only to the sessions waiting for them.
+
+    The backend appends each answer to its own stream
+    (`supervisor_answers:<request_id>`). Every worker process reads the
+    streams its sessions wait on through its own consumer group, so:
+
+    - an answer written while the process was disconnected (or before it
+      registered) is still read, the group starts at the beginning of the stream
+    - entries are acked only after the callbacks ran, and after a Redis error
+      the process first re-reads what it was handed but never acked
+    - retention is bounded: streams are capped and expire on the backend side
+    """
+
+    def __init__(
+        self,
+        redis,
+        stream_prefix: str = "supervisor_answers",
+        group: Optional[str] = None,
+        block_ms: int = 1000,
+    ):
+        self.redis = redis
+        self.stream_prefix = stream_prefix
+        self.group = group or f"agent:{socket.gethostname()}:{os.getpid()}"
+        self.consumer = self.group
+        self.block_ms = block_ms
+
+        self._waiting: Dict[int, List[AnswerCallback]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._replay = True
+        self._deliveries: set = set()
+
+        self.stats = DeliveryStats()
+
+    def stream(self, request_id: int) -> str:
+        return f"{self.stream_prefix}:{request_id}"
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._replay = True
+            self._task = asyncio.create_task(self._run())
+
+    async def register(self, request_id: int, callback: AnswerCallback) -> None:
+        self.ensure_started()
+
+        callbacks = self._waiting.setdefault(request_id, [])
+        callbacks.append(callback)
+        if len(callbacks) == 1:
+            await self._create_group(self.stream(request_id))
+            self._wakeup.set()
+
+        logger.info(f"Waiting for supervisor answer to request {request_id}")
+
+    async def unregister(self, request_id: int, callback: AnswerCallback) -> None:
+        callbacks = self._waiting.get(request_id)
+        if not callbacks or callback not in callbacks:
+            return
+
+        callbacks.remove(callback)
+        if not callbacks:
+            del self._waiting[request_id]
+            await self._destroy_group(self.stream(request_id))
+
+    async def _create_group(self, stream: str) -> None:
+        try:
+            await self.redis.xgroup_create(stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        # an unanswered request must not leave an empty stream behind forever,
+        # the backend's XADD refreshes this
+        await self.redis.expire(stream, ANSWER_STREAM_RETENTION_SECONDS)
+
+    async def _destroy_group(self, stream: str) -> None:
+        try:
+            await self.redis.xgroup_destroy(stream, self.group)
+        except ResponseError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self._waiting:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                # "0" re-reads entries handed to this consumer but never acked
+                replay = self._replay
+                start = "0" if replay else ">"
+                streams = {self.stream(request_id): start for request_id in list(self._waiting)}
+
+                response = await self.redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    streams,
+                    count=10,
+                    block=None if replay else self.block_ms,
+                )
+                self._replay = False
+
+                for stream, entries in response or []:
+                    for entry_id, fields in entries:
+                        await self._dispatch(stream, entry_id, fields, replay)
+
+            except asyncio.CancelledError:
+                raise
+            except ResponseError as e:
+                if "NOGROUP" not in str(e):
+                    logger.error(f"Supervisor answer router error: {e}", exc_info=True)
+                    await asyncio.sleep(1)
+                # a stream (and its group) expired or was deleted while waiting
+                try:
+                    for request_id in list(self._waiting):
+                        await self._create_group(self.stream(request_id))
+                except Exception as e:
+                    logger.error(f"Recreating answer consumer groups failed: {e}")
+                    self._replay = True
+                    await asyncio.sleep(1)
+            except Exception as e:
+                logger.error(f"Supervisor answer router error: {e}", exc_info=True)
+                self._replay = True
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, stream: str, entry_id: str, fields: Optional[dict], replay: bool) -> None:
+        # pending entries that were trimmed in the meantime come back without fields
+        if not fields:
+            await self.redis.xack(stream, self.group, entry_id)
+            return
+
+        try:
+            data = json.loads(fields["data"])
+            request_id = int(stream.rsplit(":", 1)[1])
+        except (KeyError, json.JSONDecodeError, ValueError, IndexError):
+            logger.error(f"Invalid supervisor answer {entry_id} on {stream}: {fields!r}")
+            await self.redis.xack(stream, self.group, entry_id)
+            return
+
+        # entry IDs start with the ms timestamp of the XADD
+        lag_ms = max(0.0, time.time() * 1000 - int(entry_id.split("-", 1)[0]))
+        self.stats.answers += 1
+        self.stats.last_lag_ms = lag_ms
+        self.stats.lag_total_ms += lag_ms
+        self.stats.lag_max_ms = max(self.stats.lag_max_ms, lag_ms)
+        SUPERVISOR_ANSWER_LAG_SECONDS.observe(lag_ms / 1000)
+        if replay:
+            self.stats.replayed += 1
+
+        # one answer per request, later entries have nobody to go to
+        callbacks = self._waiting.pop(request_id, [])
+        logger.info(
+            f"Supervisor answer for request {request_id} reached {len(callbacks)} session(s) "
+            f"after {lag_ms:.0f}ms"
+        )
+
+        task = asyncio.create_task(self._deliver(stream, entry_id, data, callbacks))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, stream: str, entry_id: str, data: dict, callbacks: List[AnswerCallback]) -> None:
+        results = await asyncio.gather(*(callback(data) for callback in callbacks), return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                self.stats.failed += 1
+                logger.error(f"Delivering supervisor answer failed: {result}")
+            else:
+                self.stats.delivered += 1
+
+        try:
+            await self.redis.xack(stream, self.group, entry_id)
+            await self._destroy_group(stream)
+        except Exception as e:
+            # stays pending, re-read (and dropped, nobody waits anymore) after a reconnect
+            logger.warning(f"Acking supervisor answer {entry_id} failed: {e}")
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        return {
+            "waiting_requests": len(self._waiting),
+            "waiting_sessions": sum(len(callbacks) for callbacks in self._waiting.values()),
+            "answers": stats.answers,
+            "delivered": stats.delivered,
+            "failed": stats.failed,
+            "replayed": stats.replayed,
+            "avg_lag_ms": stats.lag_total_ms / stats.answers if stats.answers else 0.0,
+            "max_lag_ms": stats.lag_max_ms,
+            "last_lag_ms": stats.last_lag_ms,
+        }
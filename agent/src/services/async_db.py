@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from .metrics import DB_CHECKOUT_SECONDS
+
+logger = logging.getLogger("async_db")
+
+
+# Async counterpart of db.get_pool, used from coroutines (agent tool calls)
+# so queries never block the worker's event loop. It serves the calls, the
+# sync pool only prewarm, so it is sized on its own: each job process keeps
+# both open against Postgres max_connections.
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+
+    async with _pool_lock:
+        if _pool is None:
+            pool = AsyncConnectionPool(
+                os.getenv("DB_URL"),
+                min_size=int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", "10")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                kwargs={"row_factory": dict_row},
+                check=AsyncConnectionPool.check_connection,
+                open=False,
+            )
+            await pool.open()
+            logger.info("Async DB pool opened")
+            _pool = pool
+
+    return _pool
+
+
+def get_async_db():
+    """Checks out a pooled async connection: `async with get_async_db() as conn: ...`"""
+    return _AsyncConnection()
+
+
+class _AsyncConnection:
+    # defers pool creation to the first `async with`, get_async_db stays sync
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        pool = await get_async_pool()
+        self._ctx = pool.connection()
+        conn = await self._ctx.__aenter__()
+        DB_CHECKOUT_SECONDS.labels(pool="async").observe(time.perf_counter() - start)
+        return conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._ctx.__aexit__(exc_type, exc, tb)
+
+
+async def close_async_pool() -> None:
+    """Job shutdown, the next job of the process opens a new pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
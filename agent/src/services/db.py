@@ -1,9 +1,282 @@
+import logging
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Iterator, Optional, Tuple
+
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 
+from .metrics import DB_CHECKOUT_SECONDS
+
+logger = logging.getLogger("db")
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+@dataclass
+class PoolStats:
+    min_size: int
+    max_size: int
+    size: int
+    idle: int
+    in_use: int
+    checkouts: int
+    waits: int
+    wait_time_total: float
+    wait_time_max: float
+    timeouts: int
+    connects: int
+    discarded: int
+    health_check_failures: int
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool shared by the agent services.
+
+    - keeps at least min_size connections open once used, never more than max_size
+    - checkout blocks up to `timeout` seconds when every connection is in use
+    - connections idle for longer than `check_after` seconds are pinged on checkout
+    - connections that errored, were closed or outlived `max_lifetime` are recycled
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        check_after: float = 30.0,
+        max_lifetime: float = 3600.0,
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_lifetime = max_lifetime
+
+        # (connection, created_at, returned_at)
+        self._idle: Deque[Tuple[psycopg2.extensions.connection, float, float]] = deque()
+        self._created = {}
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._connects = 0
+        self._discarded = 0
+        self._health_failures = 0
+
+    # ----------------- Checkout / Return -----------------
+
+    def getconn(self) -> psycopg2.extensions.connection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeoutError("Connection pool is closed")
+
+                    if self._idle:
+                        conn, created_at, returned_at = self._idle.pop()
+                        self._in_use += 1
+                        break
+
+                    if self._size < self.max_size:
+                        conn = None
+                        self._size += 1
+                        self._in_use += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout}s "
+                            f"({self._in_use}/{self.max_size} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._healthy(conn, created_at, returned_at):
+                self._discard(conn)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                self._wait_total += wait_time
+                self._wait_max = max(self._wait_max, wait_time)
+            # includes connecting / the health check ping, what the caller actually waited
+            DB_CHECKOUT_SECONDS.labels(pool="sync").observe(wait_time)
+
+            return conn
+
+    def putconn(self, conn: psycopg2.extensions.connection, discard: bool = False) -> None:
+        if not discard and not conn.closed:
+            try:
+                # never hand out a connection with an open transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, self._created.get(id(conn), time.monotonic()), time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # broken socket / server side termination, do not reuse it
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    # ----------------- Internals -----------------
+
+    def _connect(self) -> psycopg2.extensions.connection:
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+            self._connects += 1
+        return conn
+
+    def _healthy(self, conn, created_at: float, returned_at: float) -> bool:
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if now - created_at > self.max_lifetime:
+            return False
+        if now - returned_at < self.check_after:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._health_failures += 1
+            logger.warning("Discarding unhealthy pooled DB connection")
+            return False
+
+    def _discard(self, conn, in_use: bool = True) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created.pop(id(conn), None)
+            self._discarded += 1
+        self._release_slot(in_use)
+
+    def _release_slot(self, in_use: bool = True) -> None:
+        # in_use: the connection was checked out, not taken from the idle queue
+        with self._cond:
+            self._size -= 1
+            if in_use:
+                self._in_use -= 1
+            self._cond.notify()
+
+    # ----------------- Lifecycle -----------------
+
+    def fill(self) -> None:
+        """Opens connections up to min_size, e.g. from a prewarm hook."""
+        conns = []
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.min_size:
+                        break
+                conns.append(self.getconn())
+        finally:
+            for conn in conns:
+                self.putconn(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+        for conn, _, _ in idle:
+            self._discard(conn, in_use=False)
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            return PoolStats(
+                min_size=self.min_size,
+                max_size=self.max_size,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._in_use,
+                checkouts=self._checkouts,
+                waits=self._waits,
+                wait_time_total=self._wait_total,
+                wait_time_max=self._wait_max,
+                timeouts=self._timeouts,
+                connects=self._connects,
+                discarded=self._discarded,
+                health_check_failures=self._health_failures,
+            )
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    os.getenv("DB_URL"),
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                    # prewarm and the sync KB paths, calls use the async pool
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "2")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                )
+    return _pool
+
+
 def get_db():
-    return psycopg2.connect(
-        os.getenv("DB_URL"),
-        cursor_factory=RealDictCursor
-    )
+    """Checks out a pooled connection: `with get_db() as conn: ...`"""
+    return get_pool().connection()
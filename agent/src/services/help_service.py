@@ -1,11 +1,42 @@
 import logging
+import re
 from datetime import datetime, timezone
 from typing import Optional
 from dataclasses import dataclass
+from .async_db import get_async_db
 from .db import get_db
 
 logger = logging.getLogger("help_service")
 
+# Identical escalations attach to the open (pending) request for the same
+# question instead of inserting a new one, see ux_help_requests_open_question.
+# The no-op DO UPDATE makes RETURNING give back the existing row; xmax is 0
+# only for a freshly inserted one. The request keeps its first caller, every
+# caller waiting on it goes to help_request_callers in the same statement so
+# the team can follow up with all of them.
+INSERT_REQUEST_SQL = """
+    WITH request AS (
+        INSERT INTO help_requests (business_id, customer_id, question, normalized_question, status, created_at)
+        VALUES (%(business_id)s, %(customer_id)s, %(question)s, %(normalized_question)s, 'pending', %(created_at)s)
+        ON CONFLICT (business_id, normalized_question) WHERE status = 'pending'
+        DO UPDATE SET normalized_question = EXCLUDED.normalized_question
+        RETURNING id, business_id, customer_id, question, status, supervisor_answer, created_at, answered_at,
+                  (xmax = 0) AS inserted
+    ), caller AS (
+        INSERT INTO help_request_callers (help_request_id, customer_id, created_at)
+        SELECT id, %(customer_id)s, %(created_at)s FROM request
+        ON CONFLICT DO NOTHING
+    )
+    SELECT * FROM request
+"""
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_question(question: str) -> str:
+    # case, punctuation and spacing only, different wording stays a different request
+    return " ".join(_NON_WORD.sub(" ", question.lower()).split())
+
 
 @dataclass
 class HelpRequest:
@@ -17,6 +48,8 @@ class HelpRequest:
     supervisor_answer: Optional[str] = None
     created_at: Optional[str] = None
     answered_at: Optional[str] = None
+    # attached to an already open request for the same question
+    coalesced: bool = False
 
 
 class HelpRequestService:
@@ -26,44 +59,76 @@ class HelpRequestService:
 
     # creates a help req entry in the table 
     def create_request(self, question: str, business_id: int, customer_id: int) -> HelpRequest:
-        conn = None
         try:
-            conn = get_db()
-            cur = conn.cursor()
-
-            created_at = datetime.now(timezone.utc)
-
-            cur.execute(
-                """
-                INSERT INTO help_requests (business_id, customer_id, question, status, created_at)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id, business_id, customer_id, question, status, supervisor_answer, created_at, answered_at
-                """,
-                (business_id, customer_id, question, "pending", created_at)
-            )
-
-            row = cur.fetchone()
-            conn.commit()
-
-            help_req = HelpRequest(
-                id=row["id"],
-                business_id=row["business_id"],
-                customer_id=row["customer_id"],
-                question=row["question"],
-                status=row["status"],
-                supervisor_answer=row["supervisor_answer"],
-                created_at=row["created_at"].isoformat() if row["created_at"] else None,
-                answered_at=row["answered_at"].isoformat() if row["answered_at"] else None,
-            )
+            # the pool rolls back anything left uncommitted when the connection is returned
+            with get_db() as conn:
+                cur = conn.cursor()
 
-            logger.info(f"Help request created: {help_req.id}")
+                created_at = datetime.now(timezone.utc)
+
+                cur.execute(
+                    INSERT_REQUEST_SQL,
+                    self._insert_params(question, business_id, customer_id, created_at)
+                )
+
+                row = cur.fetchone()
+                conn.commit()
+
+                help_req = self._to_help_request(row)
+
+                self._log_created(help_req)
+                return help_req
+
+        except Exception as e:
+            logger.error(f"Error creating help request: {e}", exc_info=True)
+            raise
+
+    # same as create_request without blocking the event loop
+    async def create_request_async(self, question: str, business_id: int, customer_id: int) -> HelpRequest:
+        try:
+            # committed when the block exits cleanly, rolled back otherwise
+            async with get_async_db() as conn:
+                created_at = datetime.now(timezone.utc)
+
+                cur = await conn.execute(
+                    INSERT_REQUEST_SQL,
+                    self._insert_params(question, business_id, customer_id, created_at)
+                )
+                row = await cur.fetchone()
+
+            help_req = self._to_help_request(row)
+
+            self._log_created(help_req)
             return help_req
 
         except Exception as e:
             logger.error(f"Error creating help request: {e}", exc_info=True)
-            if conn:
-                conn.rollback()
             raise
-        finally:
-            if conn:
-                conn.close()
+
+    def _insert_params(self, question: str, business_id: int, customer_id: int, created_at: datetime) -> dict:
+        return {
+            "business_id": business_id,
+            "customer_id": customer_id,
+            "question": question,
+            "normalized_question": normalize_question(question),
+            "created_at": created_at,
+        }
+
+    def _to_help_request(self, row: dict) -> HelpRequest:
+        return HelpRequest(
+            id=row["id"],
+            business_id=row["business_id"],
+            customer_id=row["customer_id"],
+            question=row["question"],
+            status=row["status"],
+            supervisor_answer=row["supervisor_answer"],
+            created_at=row["created_at"].isoformat() if row["created_at"] else None,
+            answered_at=row["answered_at"].isoformat() if row["answered_at"] else None,
+            coalesced=not row.get("inserted", True),
+        )
+
+    def _log_created(self, help_req: HelpRequest) -> None:
+        if help_req.coalesced:
+            logger.info(f"Escalation attached to open help request: {help_req.id}")
+        else:
+            logger.info(f"Help request created: {help_req.id}")
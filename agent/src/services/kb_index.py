@@ -0,0 +1,353 @@
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from frontdesk_shared.embeddings import Embedder
+from frontdesk_shared.text import STOP_WORDS
+from scipy import sparse
+
+from .vector_index import VectorIndex
+
+logger = logging.getLogger("kb_index")
+
+
+# joins all questions into one string for substring lookups, never appears in a query
+_SEPARATOR = "\x00"
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in text.split() if w not in STOP_WORDS and len(w) > 2]
+
+
+@dataclass
+class KBEntry:
+    article_id: str
+    question: str
+    answer: str
+    category: Optional[str]
+    # precomputed at index time so queries never re-tokenize the KB
+    question_lower: str
+    tokens: FrozenSet[str]
+
+
+def make_entry(article_id: str, question: str, answer: str, category: Optional[str]) -> KBEntry:
+    question_lower = question.lower()
+    return KBEntry(
+        article_id=article_id,
+        question=question,
+        answer=answer,
+        category=category,
+        question_lower=question_lower,
+        tokens=frozenset(tokenize(question_lower)),
+    )
+
+
+class KBIndex:
+    """
+    Resident, pre-tokenized knowledge base for a single business.
+
+    Besides the entries themselves it keeps an inverted index
+    (token -> positions) and a question -> positions map, so a query only
+    looks at articles that could score above zero. Positions follow the
+    order articles were loaded / inserted in, which is the tie-break order
+    used by the ranking.
+    """
+
+    def __init__(self, business_id: int, embedder: Optional[Embedder] = None):
+        self.business_id = business_id
+        self.embedder = embedder
+        # only kept when semantic retrieval is enabled
+        self.vectors: Optional[VectorIndex] = VectorIndex(embedder.dim) if embedder else None
+        self._slots: List[Optional[KBEntry]] = []
+        self._positions: Dict[str, int] = {}
+
+        self._postings: Dict[str, Set[int]] = {}
+        self._questions: Dict[str, Set[int]] = {}
+        self._question_lengths: Dict[int, int] = {}
+
+        # lazily rebuilt after writes, used for "query in kb_question"
+        self._corpus: Optional[str] = None
+        self._corpus_starts: List[int] = []
+        self._corpus_positions: List[int] = []
+
+        # lazily rebuilt after writes, used by score_many
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._matrix_positions: Optional[np.ndarray] = None
+        self._matrix_sizes: Optional[np.ndarray] = None
+        self._vocab: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[KBEntry]:
+        return iter([e for e in self._slots if e is not None])
+
+    def entry(self, pos: int) -> KBEntry:
+        return self._slots[pos]
+
+    # ----------------- Writes -----------------
+
+    def upsert(
+        self,
+        article_id: str,
+        title: Optional[str],
+        content: dict,
+        embedding: Optional[bytes] = None,
+        embedding_model: Optional[str] = None,
+    ) -> bool:
+        """
+        Adds or replaces one article. Articles without an answer are not
+        searchable, so they are dropped (and removed if already indexed).
+        The stored embedding is reused when it was made by the same model,
+        otherwise the question is embedded here.
+        """
+        article_id = str(article_id)
+        content = content or {}
+
+        question = content.get("canonical_question", title or "") or ""
+        answer = content.get("answer", "")
+        category = content.get("category")
+
+        if not answer:
+            return self.remove(article_id)
+
+        entry = make_entry(article_id, question, answer, category)
+
+        # a re-answered article keeps its original position
+        pos = self._positions.get(article_id)
+        if pos is None:
+            pos = len(self._slots)
+            self._slots.append(entry)
+            self._positions[article_id] = pos
+        else:
+            self._unlink(pos)
+            self._slots[pos] = entry
+
+        self._link(pos, entry)
+
+        if self.vectors is not None:
+            self.vectors.add(pos, self._vector(question, embedding, embedding_model))
+        return True
+
+    def _vector(self, question: str, embedding: Optional[bytes], embedding_model: Optional[str]) -> np.ndarray:
+        if embedding and embedding_model == self.embedder.name:
+            vector = np.frombuffer(embedding, dtype=np.float32)
+            if len(vector) == self.embedder.dim:
+                return vector
+        return self.embedder.embed([question])[0]
+
+    def remove(self, article_id: str) -> bool:
+        pos = self._positions.pop(str(article_id), None)
+        if pos is None:
+            return False
+
+        self._unlink(pos)
+        self._slots[pos] = None
+        if self.vectors is not None:
+            self.vectors.remove(pos)
+        return True
+
+    def _link(self, pos: int, entry: KBEntry) -> None:
+        for token in entry.tokens:
+            self._postings.setdefault(token, set()).add(pos)
+
+        self._questions.setdefault(entry.question_lower, set()).add(pos)
+        length = len(entry.question_lower)
+        self._question_lengths[length] = self._question_lengths.get(length, 0) + 1
+        self._corpus = None
+        self._matrix = None
+
+    def _unlink(self, pos: int) -> None:
+        entry = self._slots[pos]
+        if entry is None:
+            return
+
+        for token in entry.tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.discard(pos)
+                if not posting:
+                    del self._postings[token]
+
+        same_question = self._questions.get(entry.question_lower)
+        if same_question is not None:
+            same_question.discard(pos)
+            if not same_question:
+                del self._questions[entry.question_lower]
+
+        length = len(entry.question_lower)
+        self._question_lengths[length] -= 1
+        if not self._question_lengths[length]:
+            del self._question_lengths[length]
+        self._corpus = None
+        self._matrix = None
+
+    # ----------------- Reads -----------------
+
+    def candidates(self, query_lower: str, query_words: Set[str]) -> List[KBEntry]:
+        """
+        Every entry that can score above zero for the query, in index order:
+        entries sharing a token with it, plus entries whose question contains
+        or is contained in the query (those can match without a shared token).
+        """
+        if not query_lower:
+            return list(self)
+
+        positions: Set[int] = set()
+
+        for token in query_words:
+            posting = self._postings.get(token)
+            if posting:
+                positions |= posting
+
+        positions |= self._questions_within(query_lower)
+        positions |= self._questions_containing(query_lower)
+
+        return [self._slots[pos] for pos in sorted(positions)]
+
+    def semantic_candidates(self, query_vector: np.ndarray, k: int) -> List[Tuple[KBEntry, float]]:
+        """Approximate k nearest articles by cosine similarity, best first."""
+        if self.vectors is None:
+            return []
+        return [(self._slots[pos], sim) for pos, sim in self.vectors.search(query_vector, k)]
+
+    def _questions_within(self, query_lower: str) -> Set[int]:
+        # kb_question in query: look up every substring of the query whose
+        # length matches at least one indexed question
+        found: Set[int] = set()
+        size = len(query_lower)
+
+        for length in self._question_lengths:
+            if length > size:
+                continue
+            if length == 0:
+                found |= self._questions.get("", set())
+                continue
+            for start in range(size - length + 1):
+                hit = self._questions.get(query_lower[start:start + length])
+                if hit:
+                    found |= hit
+
+        return found
+
+    def _questions_containing(self, query_lower: str) -> Set[int]:
+        # query in kb_question: a single C-level scan over all questions
+        found: Set[int] = set()
+        if _SEPARATOR in query_lower:
+            return found
+
+        if self._corpus is None:
+            self._build_corpus()
+
+        corpus = self._corpus
+        starts = self._corpus_starts
+        offset = corpus.find(query_lower)
+
+        while offset != -1:
+            i = bisect_right(starts, offset) - 1
+            found.add(self._corpus_positions[i])
+
+            # skip the rest of this question, one hit per entry is enough
+            next_start = starts[i + 1] if i + 1 < len(starts) else len(corpus)
+            offset = corpus.find(query_lower, next_start)
+
+        return found
+
+    def _build_corpus(self) -> None:
+        parts: List[str] = []
+        starts: List[int] = []
+        positions: List[int] = []
+        cursor = 0
+
+        for pos, entry in enumerate(self._slots):
+            if entry is None:
+                continue
+            starts.append(cursor)
+            positions.append(pos)
+            parts.append(entry.question_lower)
+            cursor += len(entry.question_lower) + len(_SEPARATOR)
+
+        self._corpus = _SEPARATOR.join(parts)
+        self._corpus_starts = starts
+        self._corpus_positions = positions
+
+    # ----------------- Batch Scoring -----------------
+
+    def score_many(self, queries_lower: List[str], queries_words: List[Set[str]]) -> List[List[Tuple[int, float]]]:
+        """
+        Scores many queries at once. Token overlap for every (query, article)
+        pair comes from one sparse product of the query and article
+        token matrices; exact / substring matches are layered on top per query.
+        Returns, per query, (position, score) pairs with score > 0 in index order,
+        with exactly the scores the per-query ranking would give.
+        """
+        if self._matrix is None:
+            self._build_matrix()
+
+        query_matrix, query_sizes = self._query_matrix(queries_words)
+
+        # intersections[i, j] = |query_i & article_j|, only non-zero pairs are stored
+        intersections = (query_matrix @ self._matrix.T).tocoo()
+        rows = intersections.row
+        cols = intersections.col
+        common = intersections.data.astype(np.float64)
+        unions = query_sizes[rows] + self._matrix_sizes[cols] - common
+        jaccard = np.minimum(common / unions, 0.7)
+
+        scores: List[Dict[int, float]] = [{} for _ in queries_lower]
+        positions = self._matrix_positions[cols]
+        for row, pos, score in zip(rows.tolist(), positions.tolist(), jaccard.tolist()):
+            scores[row][pos] = score
+
+        for i, query_lower in enumerate(queries_lower):
+            if not query_lower:
+                substring = set(self._positions.values())
+            else:
+                substring = self._questions_within(query_lower) | self._questions_containing(query_lower)
+
+            exact = self._questions.get(query_lower, set())
+            for pos in substring:
+                scores[i][pos] = 1.0 if pos in exact else 0.8
+
+        return [sorted(per_query.items()) for per_query in scores]
+
+    def _build_matrix(self) -> None:
+        self._vocab = {token: col for col, token in enumerate(self._postings)}
+
+        positions: List[int] = []
+        indptr = [0]
+        indices: List[int] = []
+
+        for pos, entry in enumerate(self._slots):
+            if entry is None:
+                continue
+            positions.append(pos)
+            indices.extend(self._vocab[token] for token in entry.tokens)
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.int32)
+        self._matrix = sparse.csr_matrix(
+            (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(positions), len(self._vocab)),
+        )
+        self._matrix_positions = np.array(positions, dtype=np.int64)
+        self._matrix_sizes = np.diff(self._matrix.indptr).astype(np.float64)
+
+    def _query_matrix(self, queries_words: List[Set[str]]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        indptr = [0]
+        indices: List[int] = []
+
+        for words in queries_words:
+            # tokens missing from the KB only count towards the union
+            indices.extend(self._vocab[w] for w in words if w in self._vocab)
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.int32)
+        matrix = sparse.csr_matrix(
+            (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(queries_words), len(self._vocab)),
+        )
+        sizes = np.array([len(words) for words in queries_words], dtype=np.float64)
+        return matrix, sizes
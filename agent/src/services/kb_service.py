@@ -1,10 +1,74 @@
+import asyncio
+import base64
+import heapq
 import logging
-from typing import Dict, List, Optional
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+
+from frontdesk_shared.embeddings import Embedder, load_embedder
+from frontdesk_shared.metrics import span
+
+from .async_db import get_async_db
 from .db import get_db
+from .kb_index import KBEntry, KBIndex, STOP_WORDS, make_entry, tokenize
+from .metrics import KB_PHASE_SECONDS
 
 logger = logging.getLogger("kb_service")
 
+# queries scored per sparse product in search_many, bounds the intersection matrix
+BATCH_SIZE = 512
+
+KB_ARTICLES_SQL = """
+    SELECT id, title, content, embedding, embedding_model
+    FROM kb_article 
+    WHERE business_id = %s
+    ORDER BY created_at
+"""
+
+# KB_PREFILTER mode: Postgres picks the top candidates through the GIN index
+# on kb_article.question_tsv (any word starting with a query word matches, so
+# "price" finds "prices"), substring matches of the whole question first,
+# then ts_rank normalized by question length as a rough stand-in for the
+# Jaccard score. Only the fields the scorer needs come back, the final
+# ranking is still _calculate_score.
+PREFILTER_SQL = """
+    SELECT id, question, content->>'answer' AS answer, content->>'category' AS category
+    FROM (
+        SELECT id, content, question_tsv,
+               COALESCE(content->>'canonical_question', title, '') AS question
+        FROM kb_article
+        WHERE business_id = %(business_id)s
+          AND question_tsv @@ to_tsquery('simple', %(terms)s)
+          AND COALESCE(content->>'answer', '') <> ''
+    ) candidates
+    ORDER BY
+        (strpos(lower(question), %(query)s) > 0 OR strpos(%(query)s, lower(question)) > 0) DESC,
+        ts_rank(question_tsv, to_tsquery('simple', %(terms)s), 8) DESC
+    LIMIT %(limit)s
+"""
+
+# when the prefilter finds nothing the scorer can still match on a substring
+# (part of a word, a question of stop words only), the only other way an
+# article scores. Scans the business' rows in Postgres, only matches come back
+SUBSTRING_SQL = """
+    SELECT id, question, content->>'answer' AS answer, content->>'category' AS category
+    FROM (
+        SELECT id, content, COALESCE(content->>'canonical_question', title, '') AS question
+        FROM kb_article
+        WHERE business_id = %(business_id)s
+          AND COALESCE(content->>'answer', '') <> ''
+    ) articles
+    WHERE strpos(lower(question), %(query)s) > 0 OR strpos(%(query)s, lower(question)) > 0
+    LIMIT %(limit)s
+"""
+
+# letters and digits only, the tsquery parser splits on anything else
+_WORD = re.compile(r"[^\W_]+")
+
 
 @dataclass
 class KBMatch:
@@ -22,102 +86,533 @@ class KBResult:
 
 
 class KnowledgeBaseService:
-    
-    def __init__(self):
-        pass
+
+    # loads of one index thrown away for a concurrent change, before giving up
+    MAX_LOAD_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        retrieval_mode: Optional[str] = None,
+        embedder: Optional[Embedder] = None,
+        semantic_weight: Optional[float] = None,
+        prefilter: Optional[bool] = None,
+        max_resident: Optional[int] = None,
+    ):
+        # "lexical" (token overlap only), "semantic" (embeddings only) or "hybrid"
+        self.retrieval_mode = retrieval_mode or os.getenv("KB_RETRIEVAL_MODE", "lexical")
+
+        if self.retrieval_mode == "lexical":
+            self.semantic_weight = 0.0
+        elif self.retrieval_mode == "semantic":
+            self.semantic_weight = 1.0
+        elif self.retrieval_mode == "hybrid":
+            self.semantic_weight = (
+                semantic_weight if semantic_weight is not None
+                else float(os.getenv("KB_SEMANTIC_WEIGHT", "0.5"))
+            )
+        else:
+            raise ValueError(f"Unknown KB retrieval mode: {self.retrieval_mode!r}")
+
+        # articles only count as semantic hits above this cosine similarity
+        self.semantic_min_score = float(os.getenv("KB_SEMANTIC_MIN_SCORE", "0.5"))
+        self.embedder = None
+        if self.semantic_weight > 0:
+            self.embedder = embedder or load_embedder(os.getenv("KB_EMBEDDING_MODEL", "hashing-256"))
+
+        # score only the top candidates fetched per query instead of keeping
+        # the business' whole KB resident, lexical mode only
+        self.prefilter = prefilter if prefilter is not None else os.getenv("KB_PREFILTER", "0") == "1"
+        self.prefilter_limit = int(os.getenv("KB_PREFILTER_LIMIT", "50"))
+        if self.prefilter and self.semantic_weight > 0:
+            raise ValueError("KB_PREFILTER only supports the lexical retrieval mode")
+
+        # business_id -> resident index, loaded lazily on first search. A worker
+        # serves many businesses, the least recently searched are evicted
+        self.max_resident = max_resident or int(os.getenv("KB_MAX_RESIDENT", "64"))
+        self._indexes: "OrderedDict[int, KBIndex]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._async_locks: Dict[int, asyncio.Lock] = {}
+
+        # bumped by every change event (per business) and invalidate_all
+        # (epoch). A load that saw a bump read its rows before the change and
+        # is thrown away instead of installed
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0
 
     def search(self, business_id: int, query: str, max_results: int = 3) -> KBResult:
 
-        conn = None
         try:
-            conn = get_db()
-            cur = conn.cursor()
+            if self.prefilter:
+                return self._search_prefiltered(business_id, query, max_results)
 
-            cur.execute(
-                """
-                SELECT title, content 
-                FROM kb_article 
-                WHERE business_id = %s
-                """,
-                (business_id,)
-            )
-            rows = cur.fetchall()
+            index = self._get_index(business_id)
+            return self._search_index(index, query, max_results)
 
-            
-            if not rows:
-                logger.warning(f"No KB entries found for business")
-                return KBResult(hit=False, matches=[])
+        except Exception as e:
+            logger.error(f"KB search error: {e}", exc_info=True)
+            return KBResult(hit=False, matches=[], error=str(e))
 
-            # Normalize structure for ranking
-            ## Approach for dev env as data size is limited just for proof of concept 
-            processed_items = []
-            for row in rows:
-                title = row["title"]
-                content = row["content"]
-
-                # Extract question answer from JSON content
-                canonical_question = content.get("canonical_question", title or "")
-                answer_from_content = content.get("answer", "")
-                category = content.get("category")
-
-                if answer_from_content: 
-                    processed_items.append({
-                    "question": canonical_question,
-                    "answer": answer_from_content,
-                    "category": category,
-                })
-            # basic ranking 
-            matches = self._rank_results(query, processed_items)
-
-            return KBResult(
-                hit=len(matches) > 0,
-                matches=matches[:max_results]
-            )
+    async def search_async(self, business_id: int, query: str, max_results: int = 3) -> KBResult:
+        """
+        Same as search, but a cold index is loaded through the async pool so
+        the caller's event loop keeps running while the KB is fetched.
+        """
+        try:
+            if self.prefilter:
+                return await self._search_prefiltered_async(business_id, query, max_results)
+
+            index = await self._get_index_async(business_id)
+            return self._search_index(index, query, max_results)
 
         except Exception as e:
             logger.error(f"KB search error: {e}", exc_info=True)
             return KBResult(hit=False, matches=[], error=str(e))
 
-        finally:
-            if conn:
-                conn.close()
+    def _search_index(self, index: KBIndex, query: str, max_results: int) -> KBResult:
+        if not len(index):
+            logger.warning(f"No KB entries found for business {index.business_id}")
+            return KBResult(hit=False, matches=[])
+
+        # basic ranking 
+        with span(KB_PHASE_SECONDS, phase="rank"):
+            if self.semantic_weight > 0:
+                matches = self._rank_blended(query, index, max_results)
+            else:
+                matches = self._rank_results(query, index, max_results)
+
+        return KBResult(
+            hit=len(matches) > 0,
+            matches=matches
+        )
+
+    def search_many(self, business_id: int, queries: List[str], max_results: int = 3) -> List[KBResult]:
+        """
+        Bulk variant of search for offline evaluation (e.g. replaying past
+        help_requests). Loads the KB once and scores all queries together,
+        results are identical to calling search once per query.
+        """
+        if self.prefilter:
+            return [self.search(business_id, query, max_results) for query in queries]
 
-    # ----------------- Ranking Logic -----------------
+        try:
+            index = self._get_index(business_id)
 
-    def _rank_results(self, query: str, items: List[Dict]) -> List[KBMatch]:
+            if not len(index):
+                logger.warning(f"No KB entries found for business {business_id}")
+                return [KBResult(hit=False, matches=[]) for _ in queries]
 
-        query_lower = query.lower()
-        query_words = set(self._tokenize(query_lower))
+            # blended scores come from the ANN index, one query at a time
+            if self.semantic_weight > 0:
+                return [self._search_index(index, query, max_results) for query in queries]
 
-        matches = []
+            results = []
+            for start in range(0, len(queries), BATCH_SIZE):
+                results.extend(self._rank_many(queries[start:start + BATCH_SIZE], index, max_results))
+            return results
+
+        except Exception as e:
+            logger.error(f"KB batch search error: {e}", exc_info=True)
+            return [KBResult(hit=False, matches=[], error=str(e)) for _ in queries]
 
-        for item in items:
-            kb_question = item["question"].lower()
-            kb_answer = item["answer"]
-            category = item.get("category")
+    # ----------------- Prefilter Mode -----------------
+
+    def _prefilter_params(self, business_id: int, query: str) -> Optional[dict]:
+        query_lower = query.lower()
+        words = {
+            word
+            for token in self._tokenize(query_lower)
+            for word in _WORD.findall(token)
+            if len(word) > 2 and word not in STOP_WORDS
+        }
+        if not words:
+            return None
+
+        return {
+            "business_id": business_id,
+            "query": query_lower,
+            # prefix matches of plain words, nothing tsquery syntax could pick up
+            "terms": " | ".join(f"{word}:*" for word in sorted(words)),
+            "limit": self.prefilter_limit,
+        }
 
-            score = self._calculate_score(query_lower, query_words, kb_question)
+    def _substring_params(self, business_id: int, query: str) -> dict:
+        return {"business_id": business_id, "query": query.lower(), "limit": self.prefilter_limit}
+
+    def _search_prefiltered(self, business_id: int, query: str, max_results: int) -> KBResult:
+        params = self._prefilter_params(business_id, query)
+        result = None
+
+        if params is not None:
+            with span(KB_PHASE_SECONDS, phase="prefilter_query"), get_db() as conn:
+                cur = conn.cursor()
+                cur.execute(PREFILTER_SQL, params)
+                rows = cur.fetchall()
+            result = self._rank_prefiltered(query, rows, max_results)
+
+        if result is None or not result.hit:
+            with span(KB_PHASE_SECONDS, phase="substring_query"), get_db() as conn:
+                cur = conn.cursor()
+                cur.execute(SUBSTRING_SQL, self._substring_params(business_id, query))
+                rows = cur.fetchall()
+            result = self._rank_prefiltered(query, rows, max_results)
+
+        return result
+
+    async def _search_prefiltered_async(self, business_id: int, query: str, max_results: int) -> KBResult:
+        params = self._prefilter_params(business_id, query)
+        result = None
+
+        if params is not None:
+            with span(KB_PHASE_SECONDS, phase="prefilter_query"):
+                async with get_async_db() as conn:
+                    cur = await conn.execute(PREFILTER_SQL, params)
+                    rows = await cur.fetchall()
+            result = self._rank_prefiltered(query, rows, max_results)
+
+        if result is None or not result.hit:
+            with span(KB_PHASE_SECONDS, phase="substring_query"):
+                async with get_async_db() as conn:
+                    cur = await conn.execute(SUBSTRING_SQL, self._substring_params(business_id, query))
+                    rows = await cur.fetchall()
+            result = self._rank_prefiltered(query, rows, max_results)
+
+        return result
+
+    def _rank_prefiltered(self, query: str, rows: List[dict], max_results: int) -> KBResult:
+        with span(KB_PHASE_SECONDS, phase="rank"):
+            return self._rank_prefiltered_rows(query, rows, max_results)
+
+    def _rank_prefiltered_rows(self, query: str, rows: List[dict], max_results: int) -> KBResult:
+        query_lower = query.lower()
+        query_words = set(self._tokenize(query_lower))
 
+        matches = []
+        for row in rows:
+            entry = make_entry(str(row["id"]), row["question"], row["answer"], row["category"])
+            score = self._calculate_score(query_lower, query_words, entry.question_lower, entry.tokens)
             if score > 0:
                 matches.append(KBMatch(
-                    question=item["question"],
-                    answer=kb_answer,
+                    question=entry.question,
+                    answer=entry.answer,
                     score=score,
-                    category=category
+                    category=entry.category
                 ))
 
+        matches = heapq.nlargest(max_results, matches, key=lambda x: x.score)
+        logger.info(f"matches: {matches}")
+        return KBResult(hit=len(matches) > 0, matches=matches)
+
+    # ----------------- Index Management -----------------
+
+    def _get_index(self, business_id: int) -> KBIndex:
+        index = self._resident(business_id)
+        if index is not None:
+            return index
+
+        with self._lock:
+            index = self._indexes.get(business_id)
+            attempt = 0
+            while index is None:
+                attempt += 1
+                generation = self._generation(business_id)
+                loaded = self._load_index(business_id)
+                index = self._install(business_id, loaded, generation, attempt)
+            return index
+
+    async def _get_index_async(self, business_id: int) -> KBIndex:
+        index = self._resident(business_id)
+        if index is not None:
+            return index
+
+        # one load per business, concurrent sessions wait for the same fetch
+        lock = self._async_locks.setdefault(business_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(business_id)
+            attempt = 0
+            while index is None:
+                attempt += 1
+                generation = self._generation(business_id)
+                loaded = await self._load_index_async(business_id)
+                with self._lock:
+                    index = self._indexes.get(business_id) or self._install(business_id, loaded, generation, attempt)
+            return index
+
+    def _generation(self, business_id: int) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(business_id, 0)
+
+    def _install(self, business_id: int, index: KBIndex, generation: Tuple[int, int], attempt: int) -> Optional[KBIndex]:
+        """
+        Keeps a freshly loaded index, unless the business' KB changed while
+        it loaded: None then, the caller loads again. Past MAX_LOAD_ATTEMPTS
+        (a KB being bulk edited) the index serves this search only.
+        """
+        # caller holds self._lock
+        if self._generation(business_id) == generation:
+            return self._keep(business_id, index)
+
+        if attempt >= self.MAX_LOAD_ATTEMPTS:
+            logger.warning(f"KB of business {business_id} keeps changing while loading, not keeping it resident")
+            return index
+
+        logger.info(f"KB of business {business_id} changed while loading, reloading")
+        return None
+
+    def warm(self, business_id: int) -> int:
+        """Loads the business' index ahead of its first search, returns its size."""
+        return len(self._get_index(business_id))
+
+    async def warm_async(self, business_id: int) -> int:
+        return len(await self._get_index_async(business_id))
+
+    def _resident(self, business_id: int) -> Optional[KBIndex]:
+        with self._lock:
+            index = self._indexes.get(business_id)
+            if index is not None:
+                self._indexes.move_to_end(business_id)
+            return index
+
+    def _keep(self, business_id: int, index: KBIndex) -> KBIndex:
+        # caller holds self._lock
+        self._indexes[business_id] = index
+        while len(self._indexes) > self.max_resident:
+            evicted, _ = self._indexes.popitem(last=False)
+            self._async_locks.pop(evicted, None)
+            logger.info(f"Evicted KB index of business {evicted}")
+        return index
+
+    def _load_index(self, business_id: int) -> KBIndex:
+        with span(KB_PHASE_SECONDS, phase="db_fetch"), get_db() as conn:
+            cur = conn.cursor()
+            cur.execute(KB_ARTICLES_SQL, (business_id,))
+            rows = cur.fetchall()
+
+        return self._build_index(business_id, rows)
+
+    async def _load_index_async(self, business_id: int) -> KBIndex:
+        with span(KB_PHASE_SECONDS, phase="db_fetch"):
+            async with get_async_db() as conn:
+                cur = await conn.execute(KB_ARTICLES_SQL, (business_id,))
+                rows = await cur.fetchall()
+
+        return self._build_index(business_id, rows)
+
+    def _build_index(self, business_id: int, rows: List[dict]) -> KBIndex:
+        index = KBIndex(business_id, self.embedder)
+        with span(KB_PHASE_SECONDS, phase="build"):
+            for row in rows:
+                index.upsert(
+                    row["id"], row["title"], row["content"],
+                    row["embedding"], row["embedding_model"]
+                )
+
+        logger.info(f"Loaded KB index for business {business_id}: {len(index)} articles")
+        return index
+
+    def apply_update(self, event: dict) -> None:
+        """
+        Applies a change event published by the backend on the kb_updates channel.
+        Businesses that were never loaded are skipped, their first search reads
+        the table anyway.
+        """
+        business_id = int(event.get("business_id", -1))
+        event_type = event.get("type")
+
+        # a load in flight read its rows before this change
+        with self._lock:
+            self._generations[business_id] = self._generations.get(business_id, 0) + 1
+
+        if event_type == "upsert":
+            article = event.get("article") or {}
+            embedding = article.get("embedding")
+            self.upsert_article(
+                business_id, article.get("id"), article.get("title"), article.get("content"),
+                base64.b64decode(embedding) if embedding else None,
+                article.get("embedding_model"),
+            )
+        elif event_type == "delete":
+            article = event.get("article") or {}
+            with self._lock:
+                index = self._indexes.get(business_id)
+                if index is not None:
+                    index.remove(article.get("id"))
+        elif event_type == "invalidate":
+            self.invalidate(business_id)
+        else:
+            logger.warning(f"Unknown KB update type: {event_type!r}")
+
+    def upsert_article(
+        self,
+        business_id: int,
+        article_id: str,
+        title: Optional[str],
+        content: dict,
+        embedding: Optional[bytes] = None,
+        embedding_model: Optional[str] = None,
+    ) -> None:
+        if article_id is None:
+            return
+        with self._lock:
+            index = self._indexes.get(business_id)
+            if index is not None:
+                index.upsert(article_id, title, content, embedding, embedding_model)
+                logger.info(f"KB index updated for business {business_id}: {len(index)} articles")
+
+    def invalidate(self, business_id: int) -> None:
+        with self._lock:
+            self._generations[business_id] = self._generations.get(business_id, 0) + 1
+            self._indexes.pop(business_id, None)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._indexes.clear()
+
+    # ----------------- Ranking Logic -----------------
+
+    def rescore(self, query: str, result: KBResult) -> KBResult:
+        """
+        Scores the matches of a search for another query against `query`,
+        the way the retrieval mode ranks a search: those it would not match
+        are dropped, the rest reordered.
+        """
+        query_lower = query.lower()
+        query_words = set(self._tokenize(query_lower))
+        weight = self.semantic_weight
+
+        similarities = [0.0] * len(result.matches)
+        if weight > 0 and result.matches:
+            vectors = self.embedder.embed([query] + [match.question for match in result.matches])
+            similarities = [float(similarity) for similarity in vectors[1:] @ vectors[0]]
+
+        matches = []
+        for match, similarity in zip(result.matches, similarities):
+            lexical = 0.0
+            if weight < 1.0:
+                entry = make_entry("", match.question, match.answer, match.category)
+                lexical = self._calculate_score(query_lower, query_words, entry.question_lower, entry.tokens)
+
+            # same rule as _rank_blended
+            if lexical > 0:
+                semantic = max(similarity, 0.0)
+            elif weight > 0 and similarity >= self.semantic_min_score:
+                semantic = similarity
+            else:
+                continue
+
+            matches.append(KBMatch(
+                question=match.question,
+                answer=match.answer,
+                score=(1 - weight) * lexical + weight * semantic,
+                category=match.category
+            ))
+
         matches.sort(key=lambda x: x.score, reverse=True)
+        return KBResult(hit=len(matches) > 0, matches=matches, error=result.error)
+
+    def _rank_results(self, query: str, index: KBIndex, max_results: Optional[int] = None) -> List[KBMatch]:
+
+        matches = [
+            KBMatch(
+                question=entry.question,
+                answer=entry.answer,
+                score=score,
+                category=entry.category
+            )
+            for entry, score in self._score_candidates(query, index)
+        ]
+
+        # nlargest is stable, same order as a full sort on score
+        if max_results is None:
+            matches.sort(key=lambda x: x.score, reverse=True)
+        else:
+            matches = heapq.nlargest(max_results, matches, key=lambda x: x.score)
+
         logger.info(f"matches: {matches}")
         return matches
 
-    def _calculate_score(self, query: str, query_words: set, kb_question: str) -> float:
+    def _score_candidates(self, query: str, index: KBIndex) -> List[Tuple[KBEntry, float]]:
+
+        query_lower = query.lower()
+        query_words = set(self._tokenize(query_lower))
+
+        scored = []
+
+        # only articles sharing a token (or a substring) with the query can score
+        for entry in index.candidates(query_lower, query_words):
+            score = self._calculate_score(
+                query_lower, query_words, entry.question_lower, entry.tokens
+            )
+
+            if score > 0:
+                scored.append((entry, score))
+
+        return scored
+
+    def _rank_blended(self, query: str, index: KBIndex, max_results: int) -> List[KBMatch]:
+        """
+        Blends the lexical score with the cosine similarity from the ANN
+        index: (1 - w) * lexical + w * semantic. An article is a match when it
+        has any lexical score or is semantically close enough on its own.
+        """
+        weight = self.semantic_weight
+
+        # article_id -> [entry, lexical, semantic]
+        scores: Dict[str, list] = {}
+
+        if weight < 1.0:
+            for entry, score in self._score_candidates(query, index):
+                scores[entry.article_id] = [entry, score, 0.0]
+
+        query_vector = self.embedder.embed([query])[0]
+        for entry, similarity in index.semantic_candidates(query_vector, max(max_results * 4, 20)):
+            if entry.article_id in scores:
+                scores[entry.article_id][2] = max(similarity, 0.0)
+            elif similarity >= self.semantic_min_score:
+                scores[entry.article_id] = [entry, 0.0, similarity]
+
+        matches = [
+            KBMatch(
+                question=entry.question,
+                answer=entry.answer,
+                score=(1 - weight) * lexical + weight * semantic,
+                category=entry.category
+            )
+            for entry, lexical, semantic in scores.values()
+        ]
+
+        matches = heapq.nlargest(max_results, matches, key=lambda x: x.score)
+        logger.info(f"matches: {matches}")
+        return matches
+
+    def _rank_many(self, queries: List[str], index: KBIndex, max_results: int) -> List[KBResult]:
+        queries_lower = [query.lower() for query in queries]
+        queries_words = [set(self._tokenize(query)) for query in queries_lower]
+
+        results = []
+        for scored in index.score_many(queries_lower, queries_words):
+            top = heapq.nlargest(max_results, scored, key=lambda x: x[1])
+
+            matches = []
+            for pos, score in top:
+                entry = index.entry(pos)
+                matches.append(KBMatch(
+                    question=entry.question,
+                    answer=entry.answer,
+                    score=score,
+                    category=entry.category
+                ))
+
+            results.append(KBResult(hit=len(matches) > 0, matches=matches))
+
+        return results
+
+    def _calculate_score(self, query: str, query_words: set, kb_question: str, kb_words: frozenset) -> float:
         if query == kb_question:
             return 1.0
 
         if kb_question in query or query in kb_question:
             return 0.8
 
-        kb_words = set(self._tokenize(kb_question))
         if not kb_words:
             return 0.0
 
@@ -129,11 +624,4 @@ class KnowledgeBaseService:
         return min(jaccard, 0.7)
 
     def _tokenize(self, text: str) -> List[str]:
-        stop_words = {
-            'the', 'is', 'are', 'was', 'were', 'a', 'an', 'and', 'or', 'but',
-            'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from',
-            'what', 'when', 'where', 'who', 'how', 'do', 'does', 'can',
-            'could', 'would', 'should', 'your', 'my', 'our', 'their'
-        }
-
-        return [w for w in text.split() if w not in stop_words and len(w) > 2]
+        return tokenize(text)
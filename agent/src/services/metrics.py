@@ -0,0 +1,188 @@
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Optional
+
+from frontdesk_shared.metrics import LATENCY_BUCKETS
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+from prometheus_client import multiprocess
+
+logger = logging.getLogger("metrics")
+
+
+# Prometheus metrics of the agent worker. Job processes record, the main
+# worker process serves them (start_metrics_server), through the
+# PROMETHEUS_MULTIPROC_DIR directory.
+
+TURN_PHASE_SECONDS = Histogram(
+    "agent_turn_phase_seconds",
+    "Voice pipeline phases of a conversation turn (stt, eou, llm_ttft, tts_ttfb, ...)",
+    ["phase"],
+    buckets=LATENCY_BUCKETS,
+)
+
+TURN_RESPONSE_SECONDS = Histogram(
+    "agent_turn_response_seconds",
+    "End of the caller's speech to the first audio of the reply",
+    buckets=LATENCY_BUCKETS,
+)
+
+TOOL_PHASE_SECONDS = Histogram(
+    "agent_tool_phase_seconds",
+    "Phases of the agent's tool calls",
+    ["tool", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+
+KB_PHASE_SECONDS = Histogram(
+    "agent_kb_phase_seconds",
+    "KB search internals: index load (db_fetch, build), ranking, prefilter and substring queries",
+    ["phase"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_CHECKOUT_SECONDS = Histogram(
+    "agent_db_checkout_seconds",
+    "Time waiting for a pooled DB connection",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SUPERVISOR_ANSWER_LAG_SECONDS = Histogram(
+    "agent_supervisor_answer_lag_seconds",
+    "Backend XADD of a supervisor answer to its delivery in the agent",
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0),
+)
+
+JOB_READY_SECONDS = Histogram(
+    "agent_job_ready_seconds",
+    "Job start to the session being up, by process (fresh: its first job)",
+    ["process"],
+    buckets=LATENCY_BUCKETS,
+)
+
+FIRST_LOOKUP_SECONDS = Histogram(
+    "agent_first_lookup_seconds",
+    "The first lookup_information of a job, by process (fresh: its first job)",
+    ["process"],
+    buckets=LATENCY_BUCKETS,
+)
+
+KB_CACHE_LOOKUPS = Counter(
+    "agent_kb_cache_lookups",
+    "KB answer cache lookups by result (local_hit, shared_hit, miss)",
+    ["result"],
+)
+
+
+KB_SPECULATIVE_SEARCHES = Counter(
+    "agent_kb_speculative_searches",
+    "KB searches on interim transcripts (started, cancelled) and their use by lookups (used, awaited, missed)",
+    ["result"],
+)
+
+# sums over the live job processes, each reports its own pool
+DB_POOL_CONNECTIONS = Gauge(
+    "agent_db_pool_connections",
+    "Pooled DB connections by state (idle, in_use), as of the last report",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_EVENTS = Gauge(
+    "agent_db_pool_events",
+    "Pool totals of the live processes (checkouts, waits, timeouts, connects, discarded, health_check_failures)",
+    ["pool", "event"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_EVENT_FIELDS = ("checkouts", "waits", "timeouts", "connects", "discarded", "health_check_failures")
+
+
+def record_pool_stats(pool: str, stats) -> None:
+    """Reports a db.PoolStats, after prewarm and at the end of each session."""
+    DB_POOL_CONNECTIONS.labels(pool=pool, state="idle").set(stats.idle)
+    DB_POOL_CONNECTIONS.labels(pool=pool, state="in_use").set(stats.in_use)
+    for event in DB_POOL_EVENT_FIELDS:
+        DB_POOL_EVENTS.labels(pool=pool, event=event).set(getattr(stats, event))
+
+
+class TurnLatencyTracker:
+    """
+    Feeds the AgentSession `metrics_collected` events into the histograms,
+    and joins the EOU, LLM and TTS metrics of one reply (same speech_id)
+    into the response latency the caller hears.
+    """
+
+    # replies whose TTS never came (interrupted) are dropped past this many
+    MAX_OPEN_TURNS = 32
+
+    def __init__(self):
+        # speech_id -> phase -> seconds
+        self._turns: "OrderedDict[str, dict]" = OrderedDict()
+
+    def collect(self, metrics) -> None:
+        # livekit metrics models carry their kind in `type`
+        kind = getattr(metrics, "type", None)
+
+        if kind == "stt_metrics":
+            TURN_PHASE_SECONDS.labels(phase="stt").observe(metrics.duration)
+        elif kind == "eou_metrics":
+            TURN_PHASE_SECONDS.labels(phase="eou").observe(metrics.end_of_utterance_delay)
+            TURN_PHASE_SECONDS.labels(phase="transcription").observe(metrics.transcription_delay)
+            self._note(metrics, "eou", metrics.end_of_utterance_delay)
+        elif kind == "llm_metrics":
+            TURN_PHASE_SECONDS.labels(phase="llm_ttft").observe(metrics.ttft)
+            TURN_PHASE_SECONDS.labels(phase="llm").observe(metrics.duration)
+            self._note(metrics, "llm_ttft", metrics.ttft)
+        elif kind == "tts_metrics":
+            TURN_PHASE_SECONDS.labels(phase="tts_ttfb").observe(metrics.ttfb)
+            TURN_PHASE_SECONDS.labels(phase="tts").observe(metrics.duration)
+            self._note(metrics, "tts_ttfb", metrics.ttfb)
+
+    def _note(self, metrics, phase: str, seconds: float) -> None:
+        speech_id = getattr(metrics, "speech_id", None)
+        if not speech_id or seconds is None or seconds < 0:
+            return
+
+        turn = self._turns.setdefault(speech_id, {})
+        # a reply with tool calls has one LLM generation per step, the first counts
+        turn.setdefault(phase, seconds)
+
+        if phase == "tts_ttfb":
+            del self._turns[speech_id]
+            if "eou" in turn and "llm_ttft" in turn:
+                response = turn["eou"] + turn["llm_ttft"] + turn["tts_ttfb"]
+                TURN_RESPONSE_SECONDS.observe(response)
+                logger.info(
+                    f"Turn {speech_id}: eou {turn['eou'] * 1000:.0f}ms, llm_ttft {turn['llm_ttft'] * 1000:.0f}ms, "
+                    f"tts_ttfb {turn['tts_ttfb'] * 1000:.0f}ms, response {response * 1000:.0f}ms"
+                )
+
+        while len(self._turns) > self.MAX_OPEN_TURNS:
+            self._turns.popitem(last=False)
+
+
+def start_metrics_server(port: Optional[int] = None) -> None:
+    """
+    Serves /metrics on AGENT_METRICS_PORT, does nothing when it is unset.
+    Must run before the job processes start: without PROMETHEUS_MULTIPROC_DIR
+    it points them at a fresh temporary directory, they pick it up when they
+    import prometheus_client.
+    """
+    port = port or int(os.getenv("AGENT_METRICS_PORT", "0"))
+    if not port:
+        return
+
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # the worker itself imported prometheus_client already, its own few
+        # metrics (none of the per-call ones) are not served
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="agent-metrics-")
+        logger.info(f"PROMETHEUS_MULTIPROC_DIR is not set, using {os.environ['PROMETHEUS_MULTIPROC_DIR']}")
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+
+    logger.info(f"Serving metrics on :{port}/metrics")
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple
+
+from .help_service import normalize_question
+from .kb_index import tokenize
+from .kb_service import KBResult
+from .metrics import KB_SPECULATIVE_SEARCHES
+
+logger = logging.getLogger("speculative_kb")
+
+
+@dataclass
+class SpeculationStats:
+    started: int = 0
+    cancelled: int = 0
+    used: int = 0
+    awaited: int = 0
+    missed: int = 0
+
+
+class SpeculativeKBSearch:
+    """
+    Searches the KB on the caller's interim transcripts, while they are still
+    speaking, so `lookup_information` finds the result ready when the LLM
+    calls it after the turn ends. Opt-in with KB_SPECULATIVE=1, needs an STT
+    that sends interim transcripts. One per session.
+
+    - a search starts once the partial text has KB_SPECULATIVE_MIN_WORDS
+      content words and stopped changing for KB_SPECULATIVE_DEBOUNCE_MS;
+      newer text cancels the searches still running for older text
+    - results are kept per normalized partial text of the current turn, at
+      most KB_SPECULATIVE_TTL seconds and the last KB_SPECULATIVE_MAX_ENTRIES
+      of them; the first transcript after a final one starts a new turn and
+      drops them, so does a tool call taking one
+    - the tool call takes the newest one whose words and those of the LLM's
+      question (it rephrases what the caller said) are similar both ways,
+      Jaccard of at least KB_SPECULATIVE_MIN_SIMILARITY, waiting for it if
+      still running. Its matches are scored again against the question, and
+      only a hit is taken: a miss is searched again with the LLM's wording
+      before it turns into a help request
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], Awaitable[KBResult]],
+        rescore: Callable[[str, KBResult], KBResult],
+        enabled: Optional[bool] = None,
+    ):
+        self.search = search
+        self.rescore = rescore
+        self.enabled = enabled if enabled is not None else os.getenv("KB_SPECULATIVE", "0") == "1"
+        self.min_words = int(os.getenv("KB_SPECULATIVE_MIN_WORDS", "2"))
+        self.debounce = float(os.getenv("KB_SPECULATIVE_DEBOUNCE_MS", "150")) / 1000
+        self.ttl = float(os.getenv("KB_SPECULATIVE_TTL", "15"))
+        self.max_entries = int(os.getenv("KB_SPECULATIVE_MAX_ENTRIES", "8"))
+        # Jaccard of the transcript's and the question's words
+        self.min_similarity = float(os.getenv("KB_SPECULATIVE_MIN_SIMILARITY", "0.5"))
+
+        # normalized partial text -> (started_at, words, search task), current turn only
+        self._entries: "OrderedDict[str, Tuple[float, frozenset, asyncio.Task]]" = OrderedDict()
+        self._turn_ended = False
+
+        self.stats = SpeculationStats()
+
+    def on_transcript(self, transcript: str, is_final: bool) -> None:
+        """Called for every (interim or final) transcript of the caller."""
+        if not self.enabled:
+            return
+
+        # the caller speaks again, what they said before is not the next question
+        if self._turn_ended:
+            self.cancel()
+        self._turn_ended = is_final
+
+        normalized = normalize_question(transcript)
+        words = frozenset(tokenize(normalized))
+        if len(words) < self.min_words:
+            return
+
+        current = self._entries.get(normalized)
+        if current is not None and not current[2].cancelled():
+            return
+
+        # the caller kept talking or the STT revised itself, older text is stale
+        for _, _, task in self._entries.values():
+            if not task.done():
+                task.cancel()
+
+        # the final transcript is searched right away, nothing will replace it
+        task = asyncio.create_task(self._speculate(normalized, 0 if is_final else self.debounce))
+        task.add_done_callback(self._done)
+        self._entries[normalized] = (time.monotonic(), words, task)
+        self._prune()
+
+    async def take(self, question: str) -> Optional[KBResult]:
+        """The speculative result for the LLM's question, None to search normally."""
+        if not self.enabled:
+            return None
+
+        entry = self._match(question)
+        if entry is None:
+            self.stats.missed += 1
+            KB_SPECULATIVE_SEARCHES.labels(result="missed").inc()
+            return None
+
+        normalized, task = entry
+        if not task.done():
+            self.stats.awaited += 1
+            KB_SPECULATIVE_SEARCHES.labels(result="awaited").inc()
+
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if task.cancelled():
+                # superseded by newer text that did not match, search normally
+                self.stats.missed += 1
+                KB_SPECULATIVE_SEARCHES.labels(result="missed").inc()
+                return None
+            # the tool call itself was cancelled
+            raise
+
+        # taken, a second lookup in the same turn asks something else
+        self.cancel()
+
+        if result is not None and result.error is None:
+            # ranked for the caller's words, what matters is the LLM's question
+            result = self.rescore(question, result)
+
+        if result is None or result.error is not None or not result.hit:
+            self.stats.missed += 1
+            KB_SPECULATIVE_SEARCHES.labels(result="missed").inc()
+            return None
+
+        self.stats.used += 1
+        KB_SPECULATIVE_SEARCHES.labels(result="used").inc()
+        logger.info(f"Using speculative KB result of {normalized!r} for {question!r}")
+        return result
+
+    def cancel(self) -> None:
+        for _, _, task in self._entries.values():
+            if not task.done():
+                task.cancel()
+        self._entries.clear()
+
+    # ----------------- Internals -----------------
+
+    async def _speculate(self, normalized: str, delay: float) -> Optional[KBResult]:
+        if delay:
+            await asyncio.sleep(delay)
+
+        self.stats.started += 1
+        KB_SPECULATIVE_SEARCHES.labels(result="started").inc()
+        return await self.search(normalized)
+
+    def _done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self.stats.cancelled += 1
+            KB_SPECULATIVE_SEARCHES.labels(result="cancelled").inc()
+        elif task.exception() is not None:
+            logger.warning(f"Speculative KB search failed: {task.exception()}")
+
+    def _match(self, question: str) -> Optional[Tuple[str, asyncio.Task]]:
+        self._prune()
+
+        normalized = normalize_question(question)
+        entry = self._entries.get(normalized)
+        if entry is not None:
+            return normalized, entry[2]
+
+        question_words = set(tokenize(normalized))
+        if not question_words:
+            return None
+
+        # newest first, the last transcript is the most complete one
+        for text, (_, words, task) in reversed(self._entries.items()):
+            if task.cancelled():
+                continue
+            if len(question_words & words) / len(question_words | words) >= self.min_similarity:
+                return text, task
+        return None
+
+    def _prune(self) -> None:
+        expired = time.monotonic() - self.ttl
+        for text in [t for t, (started_at, _, _) in self._entries.items() if started_at < expired]:
+            del self._entries[text]
+
+        while len(self._entries) > self.max_entries:
+            _, (_, _, task) = self._entries.popitem(last=False)
+            if not task.done():
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "started": stats.started,
+            "cancelled": stats.cancelled,
+            "used": stats.used,
+            "awaited": stats.awaited,
+            "missed": stats.missed,
+        }
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .async_db import get_async_db
+
+logger = logging.getLogger("tenants")
+
+
+BUSINESS_BY_ID_SQL = """
+    SELECT id, name, phone_number, agent_instructions
+    FROM business
+    WHERE id = %s
+"""
+
+BUSINESS_BY_PHONE_SQL = """
+    SELECT id, name, phone_number, agent_instructions
+    FROM business
+    WHERE phone_number = %s
+"""
+
+# returns the existing caller for a known number (ux_customers_phone)
+UPSERT_CUSTOMER_SQL = """
+    INSERT INTO customers (phone, created_at)
+    VALUES (%s, now())
+    ON CONFLICT (phone) WHERE phone IS NOT NULL
+    DO UPDATE SET phone = EXCLUDED.phone
+    RETURNING id
+"""
+
+ANONYMOUS_CUSTOMER_SQL = """
+    INSERT INTO customers (created_at) VALUES (now()) RETURNING id
+"""
+
+# LiveKit SIP participant attributes
+SIP_DIALED_NUMBER = "sip.trunkPhoneNumber"
+SIP_CALLER_NUMBER = "sip.phoneNumber"
+
+
+@dataclass
+class Tenant:
+    business_id: int
+    name: str
+    phone_number: Optional[str] = None
+    agent_instructions: Optional[str] = None
+
+
+@dataclass
+class CallContext:
+    tenant: Tenant
+    caller_number: Optional[str] = None
+
+
+class TenantNotFound(Exception):
+    pass
+
+
+def normalize_phone(number: Optional[str]) -> Optional[str]:
+    """E.164-ish: digits with a leading +, None when there are no digits."""
+    if not number:
+        return None
+    digits = re.sub(r"\D", "", number)
+    if not digits:
+        return None
+    return f"+{digits}"
+
+
+def parse_metadata(metadata: Optional[str]) -> Dict[str, Any]:
+    if not metadata:
+        return {}
+    try:
+        data = json.loads(metadata)
+    except json.JSONDecodeError:
+        logger.warning(f"Ignoring non-JSON metadata: {metadata!r}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class TenantDirectory:
+    """
+    Resolves which business a call is for, and caches the business rows
+    (name, instructions) of the tenants this worker process served recently.
+
+    - `business_id` in the job or room metadata wins, then the dialed number
+      (metadata `dialed_number` or the SIP trunk number of the caller),
+      then DEFAULT_BUSINESS_ID
+    - tenants are kept for TENANT_CACHE_TTL seconds, at most
+      TENANT_CACHE_SIZE of them, least recently used evicted first; unknown
+      numbers are remembered as well so a misrouted trunk does not hit the
+      DB on every call
+    """
+
+    # caller number -> customers.id, callers rarely come back within a process
+    MAX_CUSTOMERS = 1024
+
+    def __init__(self, max_tenants: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_tenants = max_tenants or int(os.getenv("TENANT_CACHE_SIZE", "256"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("TENANT_CACHE_TTL", "300"))
+        default = os.getenv("DEFAULT_BUSINESS_ID")
+        self.default_business_id = int(default) if default else None
+
+        # ("id", business_id) / ("phone", number) -> (expires_at, tenant or None)
+        self._tenants: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._customers: "OrderedDict[str, int]" = OrderedDict()
+
+    async def resolve(
+        self,
+        job_metadata: Optional[str] = None,
+        room_metadata: Optional[str] = None,
+        attributes: Optional[Dict[str, str]] = None,
+    ) -> CallContext:
+        # job (explicit dispatch) metadata overrides the room's
+        metadata = {**parse_metadata(room_metadata), **parse_metadata(job_metadata)}
+        attributes = attributes or {}
+
+        caller_number = normalize_phone(metadata.get("caller_number") or attributes.get(SIP_CALLER_NUMBER))
+
+        tenant = None
+        if metadata.get("business_id") is not None:
+            tenant = await self.get(int(metadata["business_id"]))
+        else:
+            dialed = normalize_phone(metadata.get("dialed_number") or attributes.get(SIP_DIALED_NUMBER))
+            if dialed:
+                tenant = await self.by_phone(dialed)
+            if tenant is None and self.default_business_id is not None:
+                tenant = await self.get(self.default_business_id)
+
+        if tenant is None:
+            raise TenantNotFound(f"No business for metadata {metadata!r} / attributes {attributes!r}")
+
+        return CallContext(tenant=tenant, caller_number=caller_number)
+
+    async def get(self, business_id: int) -> Optional[Tenant]:
+        return await self._cached(("id", business_id), BUSINESS_BY_ID_SQL, business_id)
+
+    async def by_phone(self, number: str) -> Optional[Tenant]:
+        return await self._cached(("phone", number), BUSINESS_BY_PHONE_SQL, number)
+
+    async def customer_id(self, caller_number: Optional[str]) -> int:
+        """The caller's customers row, created on first contact."""
+        if caller_number is None:
+            # nothing to recognize them by next time
+            async with get_async_db() as conn:
+                cur = await conn.execute(ANONYMOUS_CUSTOMER_SQL)
+                return (await cur.fetchone())["id"]
+
+        customer_id = self._customers.get(caller_number)
+        if customer_id is not None:
+            self._customers.move_to_end(caller_number)
+            return customer_id
+
+        async with get_async_db() as conn:
+            cur = await conn.execute(UPSERT_CUSTOMER_SQL, (caller_number,))
+            customer_id = (await cur.fetchone())["id"]
+
+        self._customers[caller_number] = customer_id
+        while len(self._customers) > self.MAX_CUSTOMERS:
+            self._customers.popitem(last=False)
+        return customer_id
+
+    async def _cached(self, key: tuple, sql: str, param) -> Optional[Tenant]:
+        item = self._tenants.get(key)
+        if item is not None and item[0] >= time.monotonic():
+            self._tenants.move_to_end(key)
+            return item[1]
+
+        async with get_async_db() as conn:
+            cur = await conn.execute(sql, (param,))
+            row = await cur.fetchone()
+
+        tenant = Tenant(
+            business_id=row["id"],
+            name=row["name"],
+            phone_number=row["phone_number"],
+            agent_instructions=row["agent_instructions"],
+        ) if row else None
+
+        self._tenants[key] = (time.monotonic() + self.ttl, tenant)
+        self._tenants.move_to_end(key)
+        while len(self._tenants) > self.max_tenants:
+            self._tenants.popitem(last=False)
+
+        if tenant is None:
+            logger.warning(f"No business found for {key[0]} {param!r}")
+        return tenant
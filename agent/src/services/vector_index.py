@@ -0,0 +1,133 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("vector_index")
+
+
+class VectorIndex:
+    """
+    Approximate nearest-neighbour index over L2-normalized float32 vectors,
+    keyed by KBIndex position.
+
+    Small KBs are searched exhaustively. Once `train_threshold` vectors are
+    stored it becomes an inverted-file index: vectors are bucketed under
+    k-means centroids and a query only scans the `nprobe` closest buckets.
+    New vectors go to their nearest bucket; centroids are retrained when the
+    index has doubled since the last training.
+    """
+
+    def __init__(self, dim: int, train_threshold: int = 2048, nprobe: int = 8):
+        self.dim = dim
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self._row_positions = np.full(64, -1, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+        self._count = 0
+
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, pos: int, vector: np.ndarray) -> None:
+        self.remove(pos)
+
+        if self._count == len(self._vectors):
+            self._grow()
+
+        row = self._count
+        self._vectors[row] = vector
+        self._row_positions[row] = pos
+        self._rows[pos] = row
+        self._count += 1
+
+        if self._centroids is not None:
+            self._lists[int(np.argmax(self._centroids @ vector))].append(row)
+
+        if len(self._rows) >= max(self.train_threshold, 2 * self._trained_size):
+            self._train()
+
+    def remove(self, pos: int) -> None:
+        row = self._rows.pop(pos, None)
+        if row is not None:
+            # rows are reclaimed on the next training
+            self._row_positions[row] = -1
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Returns up to k (position, cosine similarity) pairs, best first."""
+        if not self._rows:
+            return []
+
+        if self._centroids is None:
+            rows = np.arange(self._count)
+        else:
+            closest = np.argsort(-(self._centroids @ query))[:self.nprobe]
+            rows = np.array(
+                [row for c in closest for row in self._lists[c]], dtype=np.int64
+            )
+
+        rows = rows[self._row_positions[rows] >= 0]
+        if not len(rows):
+            return []
+
+        sims = self._vectors[rows] @ query
+        if len(sims) > k:
+            top = np.argpartition(-sims, k)[:k]
+        else:
+            top = np.arange(len(sims))
+        top = top[np.argsort(-sims[top], kind="stable")]
+
+        return [
+            (int(self._row_positions[rows[i]]), float(sims[i])) for i in top
+        ]
+
+    def _grow(self) -> None:
+        size = len(self._vectors) * 2
+        vectors = np.zeros((size, self.dim), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        positions = np.full(size, -1, dtype=np.int64)
+        positions[:self._count] = self._row_positions[:self._count]
+        self._vectors = vectors
+        self._row_positions = positions
+
+    def _train(self, iterations: int = 10) -> None:
+        # compact away removed rows first
+        live = np.flatnonzero(self._row_positions[:self._count] >= 0)
+        vectors = self._vectors[live].copy()
+        positions = self._row_positions[live].copy()
+        count = len(live)
+
+        self._vectors[:count] = vectors
+        self._row_positions[:count] = positions
+        self._row_positions[count:] = -1
+        self._count = count
+        self._rows = {int(pos): row for row, pos in enumerate(positions)}
+
+        nlist = max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(count, nlist, replace=False)]
+
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = vectors[assignment == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    if norm:
+                        centroids[c] = centroid / norm
+
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        self._lists = [[] for _ in range(nlist)]
+        for row, c in enumerate(assignment.tolist()):
+            self._lists[c].append(row)
+
+        self._centroids = centroids
+        self._trained_size = count
+        logger.info(f"Trained vector index: {count} vectors, {nlist} lists")
@@ -0,0 +1,159 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import redis as redis_sync
+
+from .db import get_db
+from .kb_service import KnowledgeBaseService
+from .metrics import FIRST_LOOKUP_SECONDS, JOB_READY_SECONDS
+
+logger = logging.getLogger("warmup")
+
+
+# matches KB_VERSION_KEY on the backend (app/services/kb_events.py)
+KB_VERSION_KEY = "kb_version"
+
+# businesses with the most help requests lately, then the rest by id
+ACTIVE_BUSINESSES_SQL = """
+    SELECT b.id
+    FROM business b
+    LEFT JOIN help_requests h
+        ON h.business_id = b.id AND h.created_at > now() - interval '1 day'
+    GROUP BY b.id
+    ORDER BY count(h.id) DESC, b.id
+    LIMIT %s
+"""
+
+# a fresh process answering its first lookup within this is on target
+FIRST_LOOKUP_TARGET_SECONDS = float(os.getenv("FIRST_LOOKUP_TARGET_MS", "250")) / 1000
+
+
+class KBPrewarmer:
+    """
+    Loads KB indexes in the worker's prewarm hook, before the process is
+    handed a job, so the first lookup of a call does not pay for the DB
+    connection and the full KB fetch.
+
+    The process may then sit idle for a while before it gets a job, and KB
+    updates only reach it once the job subscribes to kb_updates. The KB
+    version of each business is read before its index is loaded, and
+    `revalidate` (right after subscribing) drops the indexes whose version
+    moved in the meantime instead of all of them.
+    """
+
+    def __init__(self, kb_service: KnowledgeBaseService, redis_url: Optional[str] = None):
+        self.kb_service = kb_service
+        self.redis_url = redis_url or os.getenv("REDIS_URL")
+        self.tenants = int(os.getenv("KB_PREWARM_TENANTS", "4"))
+        self.business_ids = [int(b) for b in os.getenv("KB_PREWARM_BUSINESS_IDS", "").split(",") if b.strip()]
+
+        # business_id -> KB version its prewarmed index reflects
+        self._versions: Dict[int, Optional[str]] = {}
+
+    def select_businesses(self) -> List[int]:
+        """KB_PREWARM_BUSINESS_IDS, DEFAULT_BUSINESS_ID, then the most active ones."""
+        limit = min(self.tenants, self.kb_service.max_resident)
+        selected = list(self.business_ids)
+
+        default = os.getenv("DEFAULT_BUSINESS_ID")
+        if default and int(default) not in selected:
+            selected.append(int(default))
+
+        if len(selected) < limit:
+            with get_db() as conn:
+                cur = conn.cursor()
+                cur.execute(ACTIVE_BUSINESSES_SQL, (limit,))
+                selected += [row["id"] for row in cur.fetchall() if row["id"] not in selected]
+
+        return selected[:max(limit, len(self.business_ids))]
+
+    def prewarm(self) -> None:
+        start = time.perf_counter()
+        try:
+            business_ids = self.select_businesses()
+        except Exception as e:
+            # the job still works, cold
+            logger.error(f"KB prewarm failed: {e}")
+            return
+
+        versions = self._read_versions(business_ids)
+        for business_id in business_ids:
+            try:
+                self.kb_service.warm(business_id)
+                self._versions[business_id] = versions.get(business_id)
+            except Exception as e:
+                logger.error(f"Prewarming KB of business {business_id} failed: {e}")
+
+        logger.info(
+            f"Prewarmed KB of businesses {list(self._versions)} in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+
+    def _read_versions(self, business_ids: List[int]) -> Dict[int, Optional[str]]:
+        if not business_ids or not self.redis_url:
+            return {}
+
+        # prewarm runs outside the job's event loop, a short-lived sync client
+        client = redis_sync.from_url(self.redis_url, decode_responses=True)
+        try:
+            values = client.mget([f"{KB_VERSION_KEY}:{b}" for b in business_ids])
+            return dict(zip(business_ids, values))
+        except Exception as e:
+            logger.warning(f"Reading KB versions failed, prewarmed indexes will be reloaded: {e}")
+            # "unknown" never matches, revalidate drops them
+            return {b: "unknown" for b in business_ids}
+        finally:
+            client.close()
+
+    async def revalidate(self, redis) -> None:
+        """Called once subscribed to kb_updates, drops prewarmed indexes that went stale."""
+        versions, self._versions = self._versions, {}
+        if not versions:
+            return
+
+        business_ids = list(versions)
+        try:
+            current = await redis.mget([f"{KB_VERSION_KEY}:{b}" for b in business_ids])
+        except Exception as e:
+            logger.warning(f"Revalidating prewarmed KB indexes failed, dropping them: {e}")
+            current = [None] * len(business_ids)
+            versions = {b: "unknown" for b in business_ids}
+
+        stale = [b for b, version in zip(business_ids, current) if version != versions[b]]
+        for business_id in stale:
+            self.kb_service.invalidate(business_id)
+
+        if stale:
+            logger.info(f"Prewarmed KB of businesses {stale} changed since prewarm, reloading lazily")
+
+
+class FirstAnswerTimer:
+    """
+    Time-to-first-answer of a job: how long until the session is up, and how
+    long its first KB lookup took. Labelled by whether this was the first job
+    of the process, which is what prewarming is meant to make fast.
+    """
+
+    _jobs_started = 0
+
+    def __init__(self):
+        FirstAnswerTimer._jobs_started += 1
+        self.process = "fresh" if FirstAnswerTimer._jobs_started == 1 else "reused"
+        self.started = time.perf_counter()
+        self._first_lookup_done = False
+
+    def ready(self) -> None:
+        JOB_READY_SECONDS.labels(process=self.process).observe(time.perf_counter() - self.started)
+
+    def lookup_done(self, seconds: float) -> None:
+        if self._first_lookup_done:
+            return
+        self._first_lookup_done = True
+
+        FIRST_LOOKUP_SECONDS.labels(process=self.process).observe(seconds)
+        if seconds > FIRST_LOOKUP_TARGET_SECONDS:
+            logger.warning(
+                f"First lookup took {seconds * 1000:.0f}ms ({self.process} process), "
+                f"target {FIRST_LOOKUP_TARGET_SECONDS * 1000:.0f}ms"
+            )
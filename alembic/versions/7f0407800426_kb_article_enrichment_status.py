@@ -0,0 +1,30 @@
+"""kb article enrichment status
+
+Revision ID: 7f0407800426
+Revises: 572727edcb5f
+Create Date: 2026-10-18 09:41:27.118604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7f0407800426'
+down_revision: Union[str, None] = '572727edcb5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+enrichment_status = sa.Enum('pending', 'done', 'failed', name='enrichmentstatus')
+
+
+def upgrade() -> None:
+    enrichment_status.create(op.get_bind(), checkfirst=True)
+    op.add_column('kb_article', sa.Column('enrichment_status', enrichment_status, server_default=sa.text("'done'"), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('kb_article', 'enrichment_status')
+    enrichment_status.drop(op.get_bind(), checkfirst=True)
@@ -1,16 +1,35 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config import settings
 from .models.business import Business
 from .models.help_request import HelpRequest
 from .models.kb_article import KBArticle
 from .models.customer import Customer
+from .models.help_request_caller import HelpRequestCaller
 
 
 engine = create_engine(settings.DB_URL, echo=True)
 
+# API and background workers, psycopg 3 in async mode. Overflow connections
+# absorb bursts above pool_size and are closed once returned.
+async_engine = create_async_engine(
+    make_url(settings.DB_URL).set(drivername="postgresql+psycopg"),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
-def get_session():
-    with Session(engine) as session:
+def async_session() -> AsyncSession:
+    # rows stay readable after commit without another round trip
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+async def get_session():
+    async with async_session() as session:
         yield session
@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, Integer, text
+from sqlalchemy import Column, Integer, Index, text
 from sqlalchemy import DateTime
 from datetime import datetime
 from typing import Optional
@@ -7,6 +7,10 @@ from typing import Optional
 
 class Business(SQLModel, table=True):
     __tablename__ = "business"
+    __table_args__ = (
+        # the agent resolves inbound calls by the number that was dialed
+        Index("ux_business_phone_number", "phone_number", unique=True),
+    )
 
     id: Optional[int] = Field(
         default=None,
@@ -19,6 +23,16 @@ class Business(SQLModel, table=True):
 
     name: str = Field(nullable=False)
 
+    # E.164, the business' inbound number (LiveKit SIP trunk number)
+    phone_number: Optional[str] = Field(default=None, nullable=True)
+
+    # appended to the agent's receptionist instructions for this business
+    agent_instructions: Optional[str] = Field(default=None, nullable=True)
+
+    # pending help requests older than this are timed out,
+    # None falls back to settings.HELP_REQUEST_SLA_SECONDS
+    help_request_sla_seconds: Optional[int] = Field(default=None, nullable=True)
+
     created_at: datetime = Field(
         sa_column=Column(
             DateTime(timezone=True),
@@ -1,12 +1,16 @@
 from sqlmodel import SQLModel, Field
 from datetime import datetime
-from sqlalchemy import Column, Integer, text
+from sqlalchemy import Column, Integer, Index, text
 from sqlalchemy import DateTime
 from typing import Optional
 
 
 class Customer(SQLModel, table=True):
     __tablename__ = "customers"
+    __table_args__ = (
+        # callers are found (or created) by their number, see agent/src/services/tenants.py
+        Index("ux_customers_phone", "phone", unique=True, postgresql_where=text("phone IS NOT NULL")),
+    )
 
     id: Optional[int] = Field(
         default=None,
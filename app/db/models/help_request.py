@@ -1,7 +1,7 @@
 import enum
 from sqlmodel import SQLModel, Field
 from datetime import datetime
-from sqlalchemy import Column, Integer, Enum, DateTime, text
+from sqlalchemy import Column, Integer, Enum, DateTime, Index, text
 from typing import Optional
 
 
@@ -13,6 +13,20 @@ class HelpStatus(enum.Enum):
 
 class HelpRequest(SQLModel, table=True):
     __tablename__ = "help_requests"
+    __table_args__ = (
+        # keyset pagination of the pending / resolved listings
+        Index("ix_help_requests_business_status_created", "business_id", "status", "created_at"),
+        # timeout sweeper, oldest pending requests across all businesses
+        Index("ix_help_requests_status_created", "status", "created_at"),
+        # one open request per question and business, identical escalations attach to it
+        Index(
+            "ux_help_requests_open_question",
+            "business_id",
+            "normalized_question",
+            unique=True,
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
 
     id: Optional[int] = Field(
         default=None,
@@ -35,6 +49,9 @@ class HelpRequest(SQLModel, table=True):
 
     question: str = Field(nullable=False)
 
+    # see normalize_question in agent/src/services/help_service.py
+    normalized_question: Optional[str] = Field(default=None, nullable=True)
+
     status: HelpStatus = Field(
         default=HelpStatus.pending,
         sa_column=Column(
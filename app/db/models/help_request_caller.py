@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from sqlalchemy import Column, DateTime, text
+
+
+class HelpRequestCaller(SQLModel, table=True):
+    """
+    Every caller waiting on a help request. Identical escalations attach to
+    the open request (ux_help_requests_open_question), which only keeps the
+    first caller in customer_id; the team follows up with all of them.
+    """
+    __tablename__ = "help_request_callers"
+
+    help_request_id: int = Field(
+        foreign_key="help_requests.id",
+        primary_key=True
+    )
+
+    customer_id: int = Field(
+        foreign_key="customers.id",
+        primary_key=True
+    )
+
+    created_at: datetime = Field(
+        sa_column=Column(
+            DateTime(timezone=True),
+            nullable=False,
+            server_default=text("now()")
+        )
+    )
@@ -1,13 +1,26 @@
+import enum
 from sqlmodel import SQLModel, Field
 from datetime import datetime
-from sqlalchemy import Column, Integer, text, DateTime
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, Integer, text, DateTime, LargeBinary, Enum, BigInteger, Index, Computed
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, TSVECTOR
 import uuid
-from typing import Optional
+from typing import List, Optional
+
+
+class EnrichmentStatus(enum.Enum):
+    pending = "pending"
+    done = "done"
+    failed = "failed"
 
 
 class KBArticle(SQLModel, table=True):
     __tablename__ = "kb_article"
+    __table_args__ = (
+        # near-duplicate candidates on write, see services/kb_dedup.py
+        Index("ix_kb_article_dedup_bands", "dedup_bands", postgresql_using="gin"),
+        # candidate prefilter of the agent's KB search (KB_PREFILTER)
+        Index("ix_kb_article_question_tsv", "question_tsv", postgresql_using="gin"),
+    )
 
     id: uuid.UUID = Field(
         default=None,
@@ -29,6 +42,40 @@ class KBArticle(SQLModel, table=True):
         sa_column=Column(JSONB, nullable=False)
     )
 
+    # float32 vector of the canonical question, see services/embedding_service.py
+    embedding: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(LargeBinary, nullable=True)
+    )
+
+    embedding_model: Optional[str] = None
+
+    # words of the canonical question, maintained by Postgres
+    question_tsv: Optional[str] = Field(
+        default=None,
+        sa_column=Column(
+            TSVECTOR,
+            Computed("to_tsvector('simple'::regconfig, COALESCE(content ->> 'canonical_question', title, ''))", persisted=True),
+        )
+    )
+
+    # MinHash LSH band hashes of the canonical question
+    dedup_bands: Optional[List[int]] = Field(
+        default=None,
+        sa_column=Column(ARRAY(BigInteger), nullable=True)
+    )
+
+    # LLM metadata extraction runs after the answer is committed,
+    # rows that predate it were enriched inline (server default)
+    enrichment_status: EnrichmentStatus = Field(
+        default=EnrichmentStatus.pending,
+        sa_column=Column(
+            Enum(EnrichmentStatus, name="enrichmentstatus"),
+            nullable=False,
+            server_default=text("'done'")
+        )
+    )
+
     created_at: datetime = Field(
         sa_column=Column(
             DateTime(timezone=True),   
@@ -1,27 +1,57 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert, tuple_
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
+import time
+import uuid
 from fastapi.middleware.cors import CORSMiddleware
-import json
-import redis
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app.db.db import get_session
+from frontdesk_shared.metrics import span
+
+from app.db.db import async_engine, get_session
 from app.db.models.help_request import HelpRequest, HelpStatus
-from app.db.models.kb_article import KBArticle
+from app.db.models.kb_article import KBArticle, EnrichmentStatus
 
-from app.services.gemini_service import extract_kb_metadata
+from app.services.gemini_service import fallback_kb_metadata
+from app.services.embedding_service import embed_question, get_embedder
+from app.services.enrichment_worker import MetadataEnrichmentWorker
+from app.services.answer_delivery import add_supervisor_answer
+from app.services.kb_dedup import match_duplicates, merge_answer, question_bands
+from app.services.kb_events import add_kb_update
+from app.services.metrics import ANSWER_PHASE_SECONDS, HTTP_REQUEST_SECONDS, render_metrics
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.redis_client import close_redis, open_redis, redis_client, sse_redis_client
+from app.services.request_events import add_request_event, stream_request_events
+from app.services.timeout_sweeper import HelpRequestTimeoutSweeper, queue_age_percentiles
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-redis_client = redis.Redis(host="localhost", port=6379, decode_responses=True)
+enrichment_worker = MetadataEnrichmentWorker(redis_client)
+timeout_sweeper = HelpRequestTimeoutSweeper(redis_client)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_redis()
+    await enrichment_worker.start()
+    await timeout_sweeper.start()
+    yield
+    await timeout_sweeper.stop()
+    await enrichment_worker.stop()
+    await async_engine.dispose()
+    await close_redis()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,45 +62,175 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+
+    # the route template, not the raw path, keeps the label set small
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code,
+    ).observe(time.perf_counter() - start)
+    return response
+
+
 class AnswerPayload(BaseModel):
     answer: str
 
 
+class BulkAnswerItem(BaseModel):
+    request_id: int
+    answer: str
 
-@app.get("/requests/pending", response_model=List[HelpRequest])
-def get_pending_requests(session: Session = Depends(get_session)):
-    stmt = select(HelpRequest).where(HelpRequest.status == HelpStatus.pending)
-    return session.exec(stmt).all()
 
+class BulkAnswerPayload(BaseModel):
+    items: List[BulkAnswerItem] = Field(..., min_length=1, max_length=500)
 
-@app.get("/requests/resolved", response_model=List[HelpRequest])
-def get_resolved_requests(session: Session = Depends(get_session)):
-    stmt = select(HelpRequest).where(HelpRequest.status == HelpStatus.resolved)
-    return session.exec(stmt).all()
 
+class BulkAnswerResult(BaseModel):
+    request_id: int
+    # resolved | not_found | already_resolved | timed_out | duplicate
+    status: str
+    kb_article_id: Optional[uuid.UUID] = None
+    # False when the answer was merged into an existing near-duplicate article
+    kb_article_created: Optional[bool] = None
 
-@app.post("/requests/{req_id}/answer")
-async def answer_help_request(
-    req_id: int,
-    payload: AnswerPayload,
-    session: Session = Depends(get_session)
+
+class KBArticleStatus(BaseModel):
+    id: uuid.UUID
+    business_id: int
+    title: Optional[str]
+    enrichment_status: EnrichmentStatus
+    created_at: datetime
+
+
+
+class HelpRequestPage(BaseModel):
+    items: List[HelpRequest]
+    next_cursor: Optional[str] = None
+
+
+async def list_help_requests(
+    session: AsyncSession,
+    status: HelpStatus,
+    newest_first: bool,
+    business_id: Optional[int],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime],
+    cursor: Optional[str],
+    limit: int,
+) -> HelpRequestPage:
+    """
+    Keyset pagination on (created_at, id), served by the
+    (business_id, status, created_at) index.
+    """
+    stmt = select(HelpRequest).where(HelpRequest.status == status)
+
+    if business_id is not None:
+        stmt = stmt.where(HelpRequest.business_id == business_id)
+    if created_after is not None:
+        stmt = stmt.where(HelpRequest.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(HelpRequest.created_at < created_before)
+
+    key = tuple_(HelpRequest.created_at, HelpRequest.id)
+    if cursor:
+        try:
+            last = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        stmt = stmt.where(key < last if newest_first else key > last)
+
+    if newest_first:
+        stmt = stmt.order_by(HelpRequest.created_at.desc(), HelpRequest.id.desc())
+    else:
+        stmt = stmt.order_by(HelpRequest.created_at, HelpRequest.id)
+
+    # one extra row tells whether there is a next page
+    rows = (await session.exec(stmt.limit(limit + 1))).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+
+    return HelpRequestPage(items=items, next_cursor=next_cursor)
+
+
+# oldest first, the supervisor queue
+@app.get("/requests/pending", response_model=HelpRequestPage)
+async def get_pending_requests(
+    business_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    session: AsyncSession = Depends(get_session)
 ):
-    help_req = session.get(HelpRequest, req_id)
+    return await list_help_requests(
+        session, HelpStatus.pending, False,
+        business_id, created_after, created_before, cursor, limit
+    )
 
-    if not help_req:
-        raise HTTPException(status_code=404, detail="Help request not found")
 
-    if help_req.status == HelpStatus.resolved:
-        raise HTTPException(status_code=400, detail="Request already resolved")
+# newest first, the history view
+@app.get("/requests/resolved", response_model=HelpRequestPage)
+async def get_resolved_requests(
+    business_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    session: AsyncSession = Depends(get_session)
+):
+    return await list_help_requests(
+        session, HelpStatus.resolved, True,
+        business_id, created_after, created_before, cursor, limit
+    )
+
 
-    # Update help request
-    help_req.supervisor_answer = payload.answer
+# Server-Sent Events feed of help request changes for the dashboard,
+# browsers resend Last-Event-ID on reconnect and get only the deltas
+@app.get("/requests/events")
+async def help_request_events(
+    business_id: Optional[int] = None,
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    return StreamingResponse(
+        stream_request_events(sse_redis_client, last_event_id_header or last_event_id, business_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# queue age percentiles of pending requests and timeout sweeper counters
+@app.get("/requests/stats")
+async def get_help_request_stats(
+    business_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    return {
+        **await queue_age_percentiles(session, business_id),
+        "sweeper": timeout_sweeper.snapshot(),
+    }
+
+
+def resolve_help_request(help_req: HelpRequest, answer: str) -> KBArticle:
+    """Marks the request resolved and builds the KB article learned from it."""
+    help_req.supervisor_answer = answer
     help_req.status = HelpStatus.resolved
     help_req.answered_at = datetime.utcnow()
 
-    # NEW: Extract metadata via llm
-    meta = await extract_kb_metadata(help_req.question, payload.answer)
+    # Metadata is extracted via llm in the background, the article is
+    # searchable right away with the raw question
+    meta = fallback_kb_metadata(help_req.question)
     kb_entry = KBArticle(
+        # generated here rather than by the server default, so a batch of
+        # articles goes out as one multi-row INSERT
+        id=uuid.uuid4(),
         business_id=help_req.business_id,
         title=help_req.question,
         content={
@@ -78,30 +238,235 @@ async def answer_help_request(
             "canonical_question": meta["canonical_question"],
             "category": meta["category"],
             "tags": meta["tags"],
-            "answer": payload.answer
-        }
+            "answer": answer
+        },
+        enrichment_status=EnrichmentStatus.pending,
+        dedup_bands=question_bands(meta["canonical_question"]),
     )
 
-    session.add(help_req)
-    session.add(kb_entry)
-    session.commit()
-    session.refresh(help_req)
+    # vector for semantic KB retrieval in the agent
+    kb_entry.embedding = embed_question(meta["canonical_question"])
+    kb_entry.embedding_model = get_embedder().name
+
+    return kb_entry
+
 
+async def learn_answers(session: AsyncSession, kb_entries: List[KBArticle]) -> List[Tuple[KBArticle, bool]]:
+    """
+    Adds the new articles to the KB. One that nearly duplicates an existing
+    article (or an earlier one of the list) updates that article's answer
+    in place instead. Returns (article, created) per entry.
+    """
+    matches = await match_duplicates(session, kb_entries)
+
+    learned = []
+    inserts = {}
+    for kb_entry, duplicate in zip(kb_entries, matches):
+        if duplicate is None:
+            inserts[kb_entry.id] = kb_entry
+            learned.append((kb_entry, True))
+        else:
+            merge_answer(duplicate, kb_entry)
+            if duplicate.id not in inserts:
+                session.add(duplicate)
+            learned.append((duplicate, False))
+
+    # ORM bulk insert, the KB rows go out as multi-row INSERTs without
+    # fetching server defaults back per row
+    if inserts:
+        await session.execute(insert(KBArticle), [
+            kb_entry.model_dump(exclude={"created_at", "question_tsv"}) for kb_entry in inserts.values()
+        ])
+
+    return learned
+
+
+def add_resolved_notifications(pipe, help_req: HelpRequest) -> None:
     msg = {
+        "type": "answer",
         "business_id": help_req.business_id,
         "request_id": help_req.id,
-        "answer": payload.answer,
+        "answer": help_req.supervisor_answer,
         "question" : help_req.question,
     }
 
-    redis_client.publish("supervisor_answers", json.dumps(msg))
+    # only the session(s) waiting on this request read its stream
+    add_supervisor_answer(pipe, msg)
+    add_request_event(pipe, "resolved", help_req)
+
+
+def add_learned_notifications(pipe, learned: List[Tuple[KBArticle, bool]]) -> None:
+    # lets agent workers refresh their resident KB index without a reload,
+    # once per article even if several answers were merged into it
+    published = set()
+    for kb_entry, _ in learned:
+        if kb_entry.id not in published:
+            published.add(kb_entry.id)
+            add_kb_update(pipe, kb_entry)
+
+
+def enqueue_enrichment(learned: List[Tuple[KBArticle, bool]]) -> None:
+    # merged answers keep the metadata of the article they landed in,
+    # the batcher merges the rest into multi-item Gemini calls
+    for kb_entry, created in learned:
+        if created:
+            enrichment_worker.enqueue(kb_entry.id, kb_entry.title or "", kb_entry.content["answer"])
+
+
+# Resolves a backlog of requests at once: one transaction, one multi-row
+# KB insert, one Redis round trip. Items that can't be answered are reported
+# per item instead of failing the whole batch.
+@app.post("/requests/answers", response_model=List[BulkAnswerResult])
+async def answer_help_requests(
+    payload: BulkAnswerPayload,
+    session: AsyncSession = Depends(get_session)
+):
+    ids = {item.request_id for item in payload.items}
+
+    # locked (in id order, so concurrent batches can't deadlock) so the
+    # timeout sweeper skips them while we answer
+    stmt = select(HelpRequest).where(HelpRequest.id.in_(ids)).order_by(HelpRequest.id).with_for_update()
+    with span(ANSWER_PHASE_SECONDS, endpoint="bulk", phase="lock"):
+        help_reqs = {help_req.id: help_req for help_req in (await session.exec(stmt)).all()}
+
+    results: List[BulkAnswerResult] = []
+    resolved = []
+    seen = set()
+
+    for item in payload.items:
+        help_req = help_reqs.get(item.request_id)
+
+        if item.request_id in seen:
+            results.append(BulkAnswerResult(request_id=item.request_id, status="duplicate"))
+            continue
+        seen.add(item.request_id)
+
+        if not help_req:
+            results.append(BulkAnswerResult(request_id=item.request_id, status="not_found"))
+        elif help_req.status == HelpStatus.resolved:
+            results.append(BulkAnswerResult(request_id=item.request_id, status="already_resolved"))
+        elif help_req.status == HelpStatus.timed_out:
+            # the caller was told the team follows up later, nobody waits for it
+            results.append(BulkAnswerResult(request_id=item.request_id, status="timed_out"))
+        else:
+            with span(ANSWER_PHASE_SECONDS, endpoint="bulk", phase="resolve"):
+                kb_entry = resolve_help_request(help_req, item.answer)
+            session.add(help_req)
+
+            result = BulkAnswerResult(request_id=item.request_id, status="resolved")
+            results.append(result)
+            resolved.append((help_req, kb_entry, result))
+
+    if not resolved:
+        return results
+
+    with span(ANSWER_PHASE_SECONDS, endpoint="bulk", phase="learn"):
+        learned = await learn_answers(session, [kb_entry for _, kb_entry, _ in resolved])
+    with span(ANSWER_PHASE_SECONDS, endpoint="bulk", phase="commit"):
+        await session.commit()
+
+    with span(ANSWER_PHASE_SECONDS, endpoint="bulk", phase="publish"):
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for (help_req, _, result), (kb_entry, created) in zip(resolved, learned):
+                result.kb_article_id = kb_entry.id
+                result.kb_article_created = created
+                add_resolved_notifications(pipe, help_req)
+            add_learned_notifications(pipe, learned)
+            await pipe.execute()
+
+    enqueue_enrichment(learned)
+
+    return results
+
+
+@app.post("/requests/{req_id}/answer")
+async def answer_help_request(
+    req_id: int,
+    payload: AnswerPayload,
+    session: AsyncSession = Depends(get_session)
+):
+    # locked so the timeout sweeper skips it while we answer
+    with span(ANSWER_PHASE_SECONDS, endpoint="single", phase="lock"):
+        help_req = await session.get(HelpRequest, req_id, with_for_update=True)
+
+    if not help_req:
+        raise HTTPException(status_code=404, detail="Help request not found")
+
+    if help_req.status == HelpStatus.resolved:
+        raise HTTPException(status_code=400, detail="Request already resolved")
+
+    if help_req.status == HelpStatus.timed_out:
+        # the caller was told the team follows up later, nobody waits for it
+        raise HTTPException(status_code=400, detail="Request timed out")
+
+    with span(ANSWER_PHASE_SECONDS, endpoint="single", phase="resolve"):
+        kb_entry = resolve_help_request(help_req, payload.answer)
+    session.add(help_req)
+
+    with span(ANSWER_PHASE_SECONDS, endpoint="single", phase="learn"):
+        learned = await learn_answers(session, [kb_entry])
+    kb_entry, created = learned[0]
+
+    with span(ANSWER_PHASE_SECONDS, endpoint="single", phase="commit"):
+        await session.commit()
+        await session.refresh(help_req)
+
+    with span(ANSWER_PHASE_SECONDS, endpoint="single", phase="publish"):
+        async with redis_client.pipeline(transaction=False) as pipe:
+            add_resolved_notifications(pipe, help_req)
+            add_learned_notifications(pipe, learned)
+            await pipe.execute()
+
+    enqueue_enrichment(learned)
 
     return {
-        "message": "Help request resolved, metadata extracted, KB updated",
-        "request": help_req
+        "message": (
+            "Help request resolved, KB updated, metadata extraction queued" if created
+            else "Help request resolved, answer merged into an existing KB article"
+        ),
+        "request": help_req,
+        "kb_article_id": kb_entry.id,
+        "kb_article_created": created,
     }
 
 
+@app.get("/kb/articles", response_model=List[KBArticleStatus])
+async def get_kb_articles(
+    business_id: int,
+    enrichment_status: Optional[EnrichmentStatus] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    stmt = select(KBArticle).where(KBArticle.business_id == business_id)
+    if enrichment_status is not None:
+        stmt = stmt.where(KBArticle.enrichment_status == enrichment_status)
+    return (await session.exec(stmt.order_by(KBArticle.created_at))).all()
+
+
+@app.get("/kb/enrichment/stats")
+async def get_enrichment_stats():
+    return {
+        "queued_jobs": enrichment_worker.pending(),
+        **enrichment_worker.batcher.snapshot(),
+    }
+
+
+@app.get("/kb/articles/{article_id}", response_model=KBArticleStatus)
+async def get_kb_article(article_id: uuid.UUID, session: AsyncSession = Depends(get_session)):
+    kb_entry = await session.get(KBArticle, article_id)
+
+    if not kb_entry:
+        raise HTTPException(status_code=404, detail="KB article not found")
+
+    return kb_entry
+
+
+# Prometheus scrape target
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
-def root():
+async def root():
     return {"message": "Support backend running"}
@@ -0,0 +1,28 @@
+import json
+
+from config import settings
+
+
+SUPERVISOR_CHANNEL = "supervisor_answers"
+
+# each stream holds the answer (or timeout) for one request, a few entries at most
+ANSWER_STREAM_MAXLEN = 16
+
+
+def answer_stream(request_id: int) -> str:
+    return f"{SUPERVISOR_CHANNEL}:{request_id}"
+
+
+def add_supervisor_answer(pipe, msg: dict) -> None:
+    """
+    Queues a message for the agent session(s) waiting on msg["request_id"]
+    onto a Redis pipeline.
+
+    The per-request stream outlives a disconnected or restarting agent
+    subscriber: it is read through a consumer group and acknowledged after
+    delivery, and expires after ANSWER_STREAM_RETENTION_SECONDS.
+    """
+    key = answer_stream(msg["request_id"])
+
+    pipe.xadd(key, {"data": json.dumps(msg)}, maxlen=ANSWER_STREAM_MAXLEN, approximate=True)
+    pipe.expire(key, settings.ANSWER_STREAM_RETENTION_SECONDS)
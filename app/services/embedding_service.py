@@ -0,0 +1,21 @@
+from typing import Optional
+
+import numpy as np
+from frontdesk_shared.embeddings import Embedder, load_embedder
+
+from config import settings
+
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder(settings.EMBEDDING_MODEL)
+    return _embedder
+
+
+def embed_question(question: str) -> bytes:
+    """float32 bytes stored in kb_article.embedding"""
+    return get_embedder().embed([question])[0].astype(np.float32).tobytes()
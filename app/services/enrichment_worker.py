@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlmodel import select
+
+from app.db.db import async_session
+from app.db.models.kb_article import KBArticle, EnrichmentStatus
+from app.services.embedding_service import embed_question, get_embedder
+from app.services.kb_dedup import question_bands
+from app.services.kb_events import publish_kb_update
+from app.services.metadata_batcher import MetadataBatcher
+
+logger = logging.getLogger("enrichment_worker")
+
+
+@dataclass
+class EnrichmentJob:
+    article_id: uuid.UUID
+    question: str
+    answer: str
+    attempts: int = 0
+
+
+class MetadataEnrichmentWorker:
+    """
+    Background queue that back-fills KBArticle metadata (key, canonical
+    question, category, tags) via Gemini after the answer has already been
+    committed and delivered to the caller.
+
+    - at most `concurrency` jobs are in flight; the batcher merges them into
+      multi-item Gemini calls and bounds how many of those run at once
+    - failed extractions are retried with exponential backoff
+    - after `max_attempts` the article is marked failed and keeps the fallback metadata
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        batcher: Optional[MetadataBatcher] = None,
+        concurrency: int = 40,
+        max_attempts: int = 3,
+        backoff: float = 2.0,
+    ):
+        self.redis_client = redis_client
+        self.batcher = batcher or MetadataBatcher()
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        self._queue: "asyncio.Queue[EnrichmentJob]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(self, article_id: uuid.UUID, question: str, answer: str) -> None:
+        self._queue.put_nowait(EnrichmentJob(article_id, question, answer))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        # articles left pending by a previous process (crash / redeploy)
+        async with async_session() as session:
+            stmt = select(KBArticle).where(KBArticle.enrichment_status == EnrichmentStatus.pending)
+            for article in (await session.exec(stmt)).all():
+                self.enqueue(article.id, article.title or "", article.content.get("answer", ""))
+
+        self._tasks = [
+            asyncio.create_task(self._run()) for _ in range(self.concurrency)
+        ]
+        logger.info(f"Enrichment worker started ({self.concurrency} workers, {self.pending()} queued)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Enrichment of article {job.article_id} crashed: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: EnrichmentJob) -> None:
+        meta: Optional[dict] = None
+
+        while meta is None:
+            job.attempts += 1
+            try:
+                meta = await self.batcher.extract(job.question, job.answer)
+            except Exception as e:
+                if job.attempts >= self.max_attempts:
+                    logger.warning(f"Giving up on article {job.article_id} after {job.attempts} attempts: {e}")
+                    await self._save(job.article_id, None)
+                    return
+
+                delay = self.backoff * (2 ** (job.attempts - 1))
+                logger.info(f"Enrichment of article {job.article_id} failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+        await self._save(job.article_id, meta)
+
+    async def _save(self, article_id: uuid.UUID, meta: Optional[dict]) -> None:
+        async with async_session() as session:
+            kb_entry = await session.get(KBArticle, article_id)
+            if not kb_entry:
+                return
+
+            if meta is None:
+                kb_entry.enrichment_status = EnrichmentStatus.failed
+            else:
+                # keep whatever answer is current, only metadata is back-filled
+                content = dict(kb_entry.content)
+                content.update({
+                    "key": meta.get("key", content.get("key")),
+                    "canonical_question": meta.get("canonical_question", content.get("canonical_question")),
+                    "category": meta.get("category", content.get("category")),
+                    "tags": meta.get("tags", content.get("tags", [])),
+                })
+                kb_entry.content = content
+                kb_entry.embedding = embed_question(content["canonical_question"])
+                kb_entry.embedding_model = get_embedder().name
+                kb_entry.dedup_bands = question_bands(content["canonical_question"])
+                kb_entry.enrichment_status = EnrichmentStatus.done
+
+            session.add(kb_entry)
+            await session.commit()
+
+            if meta is not None:
+                await publish_kb_update(self.redis_client, kb_entry)
+
+            logger.info(f"Article {article_id} enrichment {kb_entry.enrichment_status.value}")
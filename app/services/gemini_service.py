@@ -1,26 +1,44 @@
 import os
 import json
+from typing import List, Optional, Tuple
 import google.generativeai as genai
+from app.services.metrics import gemini_span
 from config import settings
 
 
 genai.configure(api_key=settings.GEMINI_API_KEY)
 
+_model = None
 
-async def extract_kb_metadata(question: str, answer: str):
+
+def get_model():
+    # one client for the whole process instead of one per extraction
+    global _model
+    if _model is None:
+        _model = genai.GenerativeModel("gemini-2.5-flash")
+    return _model
+
+
+async def generate_kb_metadata_batch(items: List[Tuple[str, str]]) -> List[Optional[dict]]:
     """
-    Uses Gemini to convert a (question, answer) pair into structured KB metadata.
-    Always returns a dict, with safe fallback on failure.
+    Extracts metadata for several (question, answer) pairs in a single Gemini call.
+    Returns one dict per item, in order; None where the response had no usable
+    entry for that item. Raises on API or parsing errors.
     """
 
+    pairs = "\n".join(
+        f'    {i}. Question: {json.dumps(question)} Answer: {json.dumps(answer)}'
+        for i, (question, answer) in enumerate(items)
+    )
+
     prompt = f"""
-    Extract structured metadata from this Q/A pair.
-    Return ONLY valid JSON — no explanation.
+    Extract structured metadata from each of these Q/A pairs.
+    Return ONLY a valid JSON array — no explanation.
 
-    Question: "{question}"
-    Answer: "{answer}"
+{pairs}
 
-    Fields:
+    Each array element must have the fields:
+    - id: the number of the Q/A pair it belongs to
     - key: machine-friendly identifier (snake_case)
     - canonical_question: clean rewritten question
     - category: one-word category
@@ -29,16 +47,31 @@ async def extract_kb_metadata(question: str, answer: str):
     Output JSON only.
     """
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    with gemini_span("metadata_batch"):
+        resp = await get_model().generate_content_async(
+            prompt,
+            generation_config={"response_mime_type": "application/json"},
+        )
+    data = json.loads(resp.text)
+
+    results: List[Optional[dict]] = [None] * len(items)
+    for entry in data if isinstance(data, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            i = int(entry.pop("id"))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= i < len(items) and "canonical_question" in entry:
+            results[i] = entry
+
+    return results
 
-    try:
-        resp = await model.generate_content_async(prompt)
-        return json.loads(resp.text)
 
-    except Exception:
-        return {
-            "key": "uncategorized",
-            "canonical_question": question,
-            "category": "general",
-            "tags": []
-        }
+def fallback_kb_metadata(question: str):
+    return {
+        "key": "uncategorized",
+        "canonical_question": question,
+        "category": "general",
+        "tags": []
+    }
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from app.db.db import async_engine, async_session
+from app.db.models.business import Business
+from app.db.models.kb_article import KBArticle
+from app.services.kb_dedup import article_question, jaccard, merge_answer, question_bands, question_tokens
+from app.services.kb_events import add_kb_invalidate, add_kb_update
+from app.services.redis_client import close_redis, redis_client
+from config import settings
+
+logger = logging.getLogger("kb_compaction")
+
+
+# past this many changed articles the agents just reload the business' KB
+INVALIDATE_AFTER = 100
+
+
+async def compact_business(business_id: int, threshold: Optional[float] = None, dry_run: bool = False) -> dict:
+    """
+    Merges the near-duplicate articles of one business: each cluster keeps
+    its oldest article (stable id, usually enriched) with the answer of the
+    newest one, the rest are deleted. Every article merged away is a near
+    duplicate of the survivor itself, similarity is not chained through
+    other members. Also back-fills dedup_bands for rows written before
+    write-time dedup existed.
+    """
+    threshold = threshold if threshold is not None else settings.KB_DEDUP_THRESHOLD
+
+    async with async_session() as session:
+        stmt = (
+            select(KBArticle)
+            .where(KBArticle.business_id == business_id)
+            .order_by(KBArticle.created_at, KBArticle.id)
+            .with_for_update()
+        )
+        articles: List[KBArticle] = list((await session.exec(stmt)).all())
+
+        backfilled = []
+        tokens = []
+        for article in articles:
+            question = article_question(article)
+            bands = question_bands(question)
+            if article.dedup_bands != bands:
+                article.dedup_bands = bands
+                backfilled.append(article)
+            tokens.append(question_tokens(question))
+
+        # LSH buckets, only articles sharing a band are compared
+        buckets: Dict[int, List[int]] = defaultdict(list)
+        for i, article in enumerate(articles):
+            for band in article.dedup_bands:
+                buckets[band].append(i)
+
+        # oldest first, each article not merged yet survives and takes the
+        # later ones close enough to it (A~B and B~C does not merge A and C)
+        merged = [False] * len(articles)
+        survivors = []
+        removed = []
+        for i, article in enumerate(articles):
+            if merged[i]:
+                continue
+            merged[i] = True
+
+            candidates = {j for band in article.dedup_bands for j in buckets[band] if not merged[j]}
+            members = [j for j in sorted(candidates) if jaccard(tokens[i], tokens[j]) >= threshold]
+            if not members:
+                continue
+
+            for j in members:
+                merged[j] = True
+            merge_answer(article, articles[members[-1]])
+            survivors.append(article)
+            removed.extend(articles[j] for j in members)
+
+        stats = {
+            "business_id": business_id,
+            "articles": len(articles),
+            "backfilled": len(backfilled),
+            "clusters": len(survivors),
+            "removed": len(removed),
+        }
+        if dry_run:
+            await session.rollback()
+            logger.info(f"KB compaction of business {business_id} (dry run): {stats}")
+            return stats
+
+        for article in {a.id: a for a in backfilled + survivors}.values():
+            session.add(article)
+        if removed:
+            await session.execute(delete(KBArticle).where(KBArticle.id.in_([a.id for a in removed])))
+        await session.commit()
+
+    if survivors:
+        await _publish(business_id, survivors, removed)
+
+    logger.info(f"KB compaction of business {business_id}: {stats}")
+    return stats
+
+
+async def _publish(business_id: int, survivors: List[KBArticle], removed: List[KBArticle]) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        if len(survivors) + len(removed) > INVALIDATE_AFTER:
+            add_kb_invalidate(pipe, business_id)
+        else:
+            for article in removed:
+                add_kb_update(pipe, article, "delete")
+            for article in survivors:
+                add_kb_update(pipe, article)
+        await pipe.execute()
+
+
+async def compact_kb(business_id: Optional[int] = None, threshold: Optional[float] = None, dry_run: bool = False) -> List[dict]:
+    if business_id is not None:
+        business_ids = [business_id]
+    else:
+        async with async_session() as session:
+            business_ids = list((await session.exec(select(Business.id).order_by(Business.id))).all())
+
+    return [await compact_business(b, threshold, dry_run) for b in business_ids]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge near-duplicate KB articles")
+    parser.add_argument("--business-id", type=int, default=None)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        # stats are logged per business
+        await compact_kb(args.business_id, args.threshold, args.dry_run)
+    finally:
+        await close_redis()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from frontdesk_shared.text import STOP_WORDS
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models.kb_article import KBArticle
+from config import settings
+
+
+# Near-duplicate detection of KB questions.
+#
+# Each article stores the LSH band hashes of a MinHash signature of its
+# question tokens (kb_article.dedup_bands, GIN indexed). Articles sharing
+# any band are candidates, and a candidate is a duplicate when the exact
+# Jaccard similarity of the token sets reaches KB_DEDUP_THRESHOLD.
+# 16 bands of 4 rows: pairs at 0.8 similarity share a band ~99.9% of the
+# time, pairs at 0.3 only ~12%.
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x6B62)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+")
+
+
+def question_tokens(question: str) -> FrozenSet[str]:
+    return frozenset(
+        w for w in _WORD.findall(question.lower())
+        if w not in STOP_WORDS and len(w) > 2
+    )
+
+
+def article_question(kb_entry: KBArticle) -> str:
+    return (kb_entry.content or {}).get("canonical_question") or kb_entry.title or ""
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def minhash_bands(tokens: Iterable[str]) -> List[int]:
+    hashes = [_hash64(t.encode("utf-8")) for t in tokens]
+    if not hashes:
+        return []
+
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+    bands = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        data = band.to_bytes(1, "big") + b"".join(r.to_bytes(8, "big") for r in rows)
+        # signed, stored as BIGINT
+        bands.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True))
+    return bands
+
+
+def question_bands(question: str) -> List[int]:
+    return minhash_bands(question_tokens(question))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+async def match_duplicates(
+    session: AsyncSession,
+    entries: List[KBArticle],
+    threshold: Optional[float] = None,
+) -> List[Optional[KBArticle]]:
+    """
+    For each new (not yet inserted) article, the article it duplicates: an
+    existing row of the same business (locked until commit) or an earlier
+    entry of the same list. None when it is new knowledge.
+    """
+    threshold = threshold if threshold is not None else settings.KB_DEDUP_THRESHOLD
+
+    all_bands = {band for entry in entries for band in entry.dedup_bands or []}
+    pool: Dict[int, List[Tuple[KBArticle, FrozenSet[str]]]] = defaultdict(list)
+
+    if all_bands:
+        stmt = (
+            select(KBArticle)
+            .where(KBArticle.business_id.in_({entry.business_id for entry in entries}))
+            .where(KBArticle.dedup_bands.overlap(sorted(all_bands)))
+            .order_by(KBArticle.created_at)
+            .with_for_update()
+        )
+        for article in (await session.exec(stmt)).all():
+            pool[article.business_id].append((article, question_tokens(article_question(article))))
+
+    matches: List[Optional[KBArticle]] = []
+    for entry in entries:
+        tokens = question_tokens(article_question(entry))
+
+        best, best_score = None, threshold
+        if tokens:
+            for article, article_tokens in pool[entry.business_id]:
+                score = jaccard(tokens, article_tokens)
+                if score >= best_score and (best is None or score > best_score):
+                    best, best_score = article, score
+
+        if best is None:
+            pool[entry.business_id].append((entry, tokens))
+        matches.append(best)
+
+    return matches
+
+
+def merge_answer(target: KBArticle, duplicate: KBArticle) -> None:
+    # the latest supervisor answer wins, the target keeps its id and metadata
+    target.content = {**target.content, "answer": duplicate.content.get("answer")}
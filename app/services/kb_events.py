@@ -0,0 +1,64 @@
+import base64
+import json
+import time
+
+from app.db.models.kb_article import KBArticle
+
+
+KB_UPDATES_CHANNEL = "kb_updates"
+
+# Latest KB version per business. Agents key their cached answers by the
+# version their index reflects, so a change makes older entries unreachable.
+KB_VERSION_KEY = "kb_version"
+
+
+def kb_version_key(business_id: int) -> str:
+    return f"{KB_VERSION_KEY}:{business_id}"
+
+
+def new_kb_version() -> str:
+    return str(time.time_ns())
+
+
+def kb_update_event(kb_entry: KBArticle, event_type: str = "upsert") -> dict:
+    """
+    Change event consumed by the agent workers to refresh their resident
+    KB index (see agent/src/services/kb_service.py:apply_update).
+    """
+    article = {
+        "id": str(kb_entry.id),
+        "title": kb_entry.title,
+        "content": kb_entry.content,
+        "embedding_model": kb_entry.embedding_model,
+        "embedding": (
+            base64.b64encode(kb_entry.embedding).decode("ascii")
+            if kb_entry.embedding else None
+        ),
+    }
+
+    return {
+        "type": event_type,
+        "business_id": kb_entry.business_id,
+        "version": new_kb_version(),
+        "article": article,
+    }
+
+
+def _add_event(pipe, event: dict) -> None:
+    pipe.set(kb_version_key(event["business_id"]), event["version"])
+    pipe.publish(KB_UPDATES_CHANNEL, json.dumps(event))
+
+
+def add_kb_update(pipe, kb_entry: KBArticle, event_type: str = "upsert") -> None:
+    _add_event(pipe, kb_update_event(kb_entry, event_type))
+
+
+def add_kb_invalidate(pipe, business_id: int) -> None:
+    _add_event(pipe, {"type": "invalidate", "business_id": business_id, "version": new_kb_version()})
+
+
+async def publish_kb_update(redis_client, kb_entry: KBArticle, event_type: str = "upsert") -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        add_kb_update(pipe, kb_entry, event_type)
+        await pipe.execute()
+
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from cachetools import LRUCache
+
+from app.services.gemini_service import generate_kb_metadata_batch
+
+logger = logging.getLogger("metadata_batcher")
+
+
+@dataclass
+class BatcherStats:
+    cache_hits: int = 0
+    cache_misses: int = 0
+    coalesced: int = 0
+    batches: int = 0
+    batch_items: int = 0
+    batch_failures: int = 0
+    max_batch_size: int = 0
+    # batch size -> number of batches of that size
+    batch_sizes: Dict[int, int] = field(default_factory=dict)
+
+
+class MetadataBatcher:
+    """
+    Merges concurrent metadata extraction requests into multi-item Gemini calls.
+
+    - requests wait up to `max_wait` seconds for others to join, a batch is
+      sent early once it has `max_batch_size` items
+    - at most `max_concurrent_batches` Gemini calls are in flight
+    - results are cached by a hash of the normalized Q/A pair, and identical
+      pairs already waiting in a batch share its result
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 10,
+        max_wait: float = 0.2,
+        max_concurrent_batches: int = 4,
+        cache_size: int = 4096,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._pending: Dict[str, Tuple[str, str, asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._semaphore = asyncio.Semaphore(max_concurrent_batches)
+        self._tasks: set = set()
+
+        self.stats = BatcherStats()
+
+    @staticmethod
+    def cache_key(question: str, answer: str) -> str:
+        normalized = "\x1f".join(" ".join(t.lower().split()) for t in (question, answer))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    async def extract(self, question: str, answer: str) -> dict:
+        """Raises if the batch call fails or has no entry for this pair."""
+        key = self.cache_key(question, answer)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.stats.cache_hits += 1
+            return dict(cached)
+
+        self.stats.cache_misses += 1
+
+        if key in self._pending:
+            self.stats.coalesced += 1
+            future = self._pending[key][2]
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = (question, answer, future)
+
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        return dict(await asyncio.shield(future))
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: Dict[str, Tuple[str, str, asyncio.Future]]) -> None:
+        keys = list(batch)
+        items = [(batch[k][0], batch[k][1]) for k in keys]
+
+        async with self._semaphore:
+            size = len(items)
+            self.stats.batches += 1
+            self.stats.batch_items += size
+            self.stats.max_batch_size = max(self.stats.max_batch_size, size)
+            self.stats.batch_sizes[size] = self.stats.batch_sizes.get(size, 0) + 1
+
+            try:
+                results = await generate_kb_metadata_batch(items)
+            except Exception as e:
+                self.stats.batch_failures += 1
+                logger.warning(f"Metadata batch of {size} failed: {e}")
+                for k in keys:
+                    self._resolve(batch[k][2], error=e)
+                return
+
+        for k, meta in zip(keys, results):
+            if meta is None:
+                self._resolve(batch[k][2], error=ValueError("No metadata returned for item"))
+            else:
+                self._cache[k] = meta
+                self._resolve(batch[k][2], result=meta)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Optional[dict] = None, error: Optional[Exception] = None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        return {
+            "cache_hits": stats.cache_hits,
+            "cache_misses": stats.cache_misses,
+            "cache_hit_rate": (
+                stats.cache_hits / (stats.cache_hits + stats.cache_misses)
+                if stats.cache_hits + stats.cache_misses else 0.0
+            ),
+            "cache_size": len(self._cache),
+            "coalesced": stats.coalesced,
+            "batches": stats.batches,
+            "batch_failures": stats.batch_failures,
+            "avg_batch_size": stats.batch_items / stats.batches if stats.batches else 0.0,
+            "max_batch_size": stats.max_batch_size,
+            "batch_sizes": dict(sorted(stats.batch_sizes.items())),
+            "queued": len(self._pending),
+        }
@@ -0,0 +1,54 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from frontdesk_shared.metrics import LATENCY_BUCKETS
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+
+# Prometheus metrics of the backend, served on GET /metrics. With several
+# uvicorn workers PROMETHEUS_MULTIPROC_DIR must point at an empty directory
+# before they start, /metrics then adds up every worker.
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to the response headers, per route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+ANSWER_PHASE_SECONDS = Histogram(
+    "help_request_answer_phase_seconds",
+    "Phases of answering help requests (lock, resolve, learn, commit, publish)",
+    ["endpoint", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+
+GEMINI_REQUEST_SECONDS = Histogram(
+    "gemini_request_seconds",
+    "Gemini metadata extraction calls",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS + (30.0, 60.0),
+)
+
+
+@contextmanager
+def gemini_span(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        GEMINI_REQUEST_SECONDS.labels(operation=operation, outcome=outcome).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
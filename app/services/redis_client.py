@@ -0,0 +1,46 @@
+import redis.asyncio as aioredis
+
+from config import settings
+
+
+# Shared by the endpoints and background workers of an API process. Blocking
+# pool: past REDIS_MAX_CONNECTIONS callers wait for a free connection instead
+# of failing.
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    decode_responses=True,
+    health_check_interval=30,
+)
+
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+# Dashboard SSE feeds only. Each open feed holds a connection for its whole
+# blocking XREAD, on their own pool so open dashboards can never starve the
+# answer endpoints of connections. Past SSE_MAX_CONNECTIONS a new feed waits
+# REDIS_POOL_TIMEOUT and fails, the browser reconnects later.
+sse_redis_pool = aioredis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.SSE_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    # has to outlast the blocking XREAD of the SSE feed (SSE_BLOCK_MS)
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    decode_responses=True,
+    health_check_interval=30,
+)
+
+sse_redis_client = aioredis.Redis(connection_pool=sse_redis_pool)
+
+
+async def open_redis() -> None:
+    # fail at startup rather than on the first answer
+    await redis_client.ping()
+
+
+async def close_redis() -> None:
+    await redis_client.aclose()
+    await redis_pool.disconnect()
+    await sse_redis_client.aclose()
+    await sse_redis_pool.disconnect()
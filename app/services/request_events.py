@@ -0,0 +1,92 @@
+import json
+import logging
+import re
+from typing import AsyncIterator, Optional
+
+from frontdesk_shared import request_events as shared_events
+from frontdesk_shared.request_events import HELP_REQUEST_EVENTS_STREAM
+
+from app.db.models.help_request import HelpRequest
+
+logger = logging.getLogger("request_events")
+
+
+# The dashboard's SSE feed over the help request events stream, see
+# frontdesk_shared.request_events.
+
+# keep-alive comment interval for idle SSE connections
+SSE_BLOCK_MS = 15000
+
+# <ms>-<seq>, both 64 bit, anything else makes XREAD fail
+_EVENT_ID = re.compile(r"(\d+)-(\d+)")
+_MAX_ID_PART = 2 ** 64 - 1
+
+
+def add_request_event(pipe, event_type: str, help_req: HelpRequest) -> None:
+    shared_events.add_request_event(pipe, event_type, help_req.model_dump(mode="json"))
+
+
+def _valid_event_id(event_id: str) -> bool:
+    match = _EVENT_ID.fullmatch(event_id)
+    return match is not None and all(int(part) <= _MAX_ID_PART for part in match.groups())
+
+
+def _is_older(event_id: str, other_id: str) -> bool:
+    ms, _, seq = event_id.partition("-")
+    other_ms, _, other_seq = other_id.partition("-")
+    return (int(ms), int(seq or 0)) < (int(other_ms), int(other_seq or 0))
+
+
+async def _latest_event_id(redis_client) -> str:
+    # resolved up front instead of XREAD "$", so nothing published between
+    # two blocking reads is skipped
+    last = await redis_client.xrevrange(HELP_REQUEST_EVENTS_STREAM, count=1)
+    return last[0][0] if last else "0-0"
+
+
+async def stream_request_events(
+    redis_client,
+    last_event_id: Optional[str] = None,
+    business_id: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Yields Server-Sent Events frames. Without a last_event_id only new events
+    are sent; with one, everything after it is replayed first. If that ID has
+    already been trimmed from the stream a `reset` event tells the client to
+    refetch its lists.
+    """
+    cursor = last_event_id or await _latest_event_id(redis_client)
+
+    if last_event_id:
+        if not _valid_event_id(last_event_id):
+            # no telling what the client missed
+            logger.warning(f"Malformed Last-Event-ID {last_event_id!r}, resetting the client")
+            reset = True
+        else:
+            first = await redis_client.xrange(HELP_REQUEST_EVENTS_STREAM, count=1)
+            reset = bool(first) and _is_older(last_event_id, first[0][0])
+
+        if reset:
+            cursor = await _latest_event_id(redis_client)
+            yield "event: reset\ndata: {}\n\n"
+
+    yield "retry: 3000\n\n"
+
+    while True:
+        response = await redis_client.xread(
+            {HELP_REQUEST_EVENTS_STREAM: cursor}, block=SSE_BLOCK_MS, count=100
+        )
+
+        if not response:
+            yield ": ping\n\n"
+            continue
+
+        for _, entries in response:
+            for event_id, fields in entries:
+                cursor = event_id
+                data = fields.get("data", "{}")
+
+                if business_id is not None and json.loads(data).get("business_id") != business_id:
+                    continue
+
+                yield f"id: {event_id}\nevent: {fields.get('type', 'message')}\ndata: {data}\n\n"
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, literal_column, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.db import async_session
+from app.db.models.business import Business
+from app.db.models.help_request import HelpRequest, HelpStatus
+from app.services.answer_delivery import add_supervisor_answer
+from app.services.request_events import add_request_event
+from config import settings
+
+logger = logging.getLogger("timeout_sweeper")
+
+
+QUEUE_AGE_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+@dataclass
+class SweeperStats:
+    sweeps: int = 0
+    timed_out: int = 0
+    last_sweep_at: Optional[datetime] = None
+    last_sweep_ms: float = 0.0
+
+
+class HelpRequestTimeoutSweeper:
+    """
+    Periodically moves pending help requests past their business' SLA to
+    timed_out, and tells the waiting agent session so the caller hears back.
+
+    - requests are expired in batches of `batch_size` with one
+      UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) each, so a
+      supervisor answering the same request at that moment is never blocked
+    - the scan walks ix_help_requests_status_created from the oldest pending
+      request and stops at the shortest SLA of any business
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        interval: Optional[float] = None,
+        batch_size: int = 500,
+        default_sla: Optional[int] = None,
+    ):
+        self.redis_client = redis_client
+        self.interval = interval or settings.HELP_REQUEST_SWEEP_INTERVAL_SECONDS
+        self.batch_size = batch_size
+        self.default_sla = default_sla or settings.HELP_REQUEST_SLA_SECONDS
+
+        self._task: Optional[asyncio.Task] = None
+        self.stats = SweeperStats()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Timeout sweeper started (every {self.interval}s, default SLA {self.default_sla}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Timeout sweep failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        start = time.perf_counter()
+        total = 0
+
+        async with async_session() as session:
+            min_sla = await self._min_sla(session)
+            while True:
+                expired = await self._expire_batch(session, min_sla)
+                if not expired:
+                    break
+                await self._notify(expired)
+                total += len(expired)
+                if len(expired) < self.batch_size:
+                    break
+
+        self.stats.sweeps += 1
+        self.stats.timed_out += total
+        self.stats.last_sweep_at = datetime.now(timezone.utc)
+        self.stats.last_sweep_ms = (time.perf_counter() - start) * 1000
+
+        if total:
+            logger.info(f"Timed out {total} help requests in {self.stats.last_sweep_ms:.0f}ms")
+        return total
+
+    def _sla(self):
+        return func.coalesce(Business.help_request_sla_seconds, self.default_sla)
+
+    async def _min_sla(self, session: AsyncSession) -> int:
+        shortest = (await session.exec(select(func.min(self._sla())))).one()
+        # 0 is a valid SLA, only no businesses at all falls back to the default
+        return self.default_sla if shortest is None else shortest
+
+    async def _expire_batch(self, session: AsyncSession, min_sla: int) -> List[HelpRequest]:
+        now = datetime.now(timezone.utc)
+
+        due = (
+            select(HelpRequest.id)
+            .join(Business, Business.id == HelpRequest.business_id)
+            .where(HelpRequest.status == HelpStatus.pending)
+            # index range bound, no business has a shorter SLA than this
+            .where(HelpRequest.created_at < now - timedelta(seconds=min_sla))
+            .where(HelpRequest.created_at < func.now() - self._sla() * literal_column("interval '1 second'"))
+            .order_by(HelpRequest.created_at)
+            .limit(self.batch_size)
+            .with_for_update(of=HelpRequest, skip_locked=True)
+        )
+
+        stmt = (
+            update(HelpRequest)
+            .where(HelpRequest.id.in_(due))
+            .values(status=HelpStatus.timed_out)
+            .returning(HelpRequest)
+            .execution_options(synchronize_session=False)
+        )
+
+        expired = list((await session.scalars(stmt)).all())
+        await session.commit()
+        return expired
+
+    async def _notify(self, expired: List[HelpRequest]) -> None:
+        # one round trip for the whole batch
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for help_req in expired:
+                # the caller's session (if still connected) apologizes, the dashboard drops it
+                add_supervisor_answer(pipe, {
+                    "type": "timed_out",
+                    "business_id": help_req.business_id,
+                    "request_id": help_req.id,
+                    "question": help_req.question,
+                })
+                add_request_event(pipe, "timed_out", help_req)
+
+            try:
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to publish timeout of {len(expired)} help requests: {e}")
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        return {
+            "sweeps": stats.sweeps,
+            "timed_out": stats.timed_out,
+            "last_sweep_at": stats.last_sweep_at,
+            "last_sweep_ms": stats.last_sweep_ms,
+            "interval_seconds": self.interval,
+            "default_sla_seconds": self.default_sla,
+        }
+
+
+async def queue_age_percentiles(session: AsyncSession, business_id: Optional[int] = None) -> dict:
+    """Age in seconds of the currently pending requests."""
+    age = func.extract("epoch", func.now() - HelpRequest.created_at)
+
+    stmt = select(
+        func.count(),
+        func.max(age),
+        *(func.percentile_cont(p).within_group(age) for p in QUEUE_AGE_PERCENTILES),
+    ).where(HelpRequest.status == HelpStatus.pending)
+    if business_id is not None:
+        stmt = stmt.where(HelpRequest.business_id == business_id)
+
+    count, oldest, *values = (await session.exec(stmt)).one()
+    return {
+        "pending": count,
+        "oldest_seconds": float(oldest) if oldest is not None else None,
+        **{
+            f"p{round(p * 100)}_seconds": float(v) if v is not None else None
+            for p, v in zip(QUEUE_AGE_PERCENTILES, values)
+        },
+    }
@@ -4,6 +4,20 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     DB_URL: str = Field(..., env="DB_URL")
     GEMINI_API_KEY: str = Field(..., env="GEMINI_API_KEY")
+    DB_POOL_SIZE: int = Field(10, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(20, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(10.0, env="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")
+    REDIS_URL: str = Field("redis://localhost:6379/0", env="REDIS_URL")
+    REDIS_MAX_CONNECTIONS: int = Field(100, env="REDIS_MAX_CONNECTIONS")
+    REDIS_POOL_TIMEOUT: float = Field(5.0, env="REDIS_POOL_TIMEOUT")
+    REDIS_SOCKET_TIMEOUT: float = Field(30.0, env="REDIS_SOCKET_TIMEOUT")
+    SSE_MAX_CONNECTIONS: int = Field(50, env="SSE_MAX_CONNECTIONS")
+    EMBEDDING_MODEL: str = Field("hashing-256", env="EMBEDDING_MODEL")
+    KB_DEDUP_THRESHOLD: float = Field(0.8, env="KB_DEDUP_THRESHOLD")
+    ANSWER_STREAM_RETENTION_SECONDS: int = Field(86400, env="ANSWER_STREAM_RETENTION_SECONDS")
+    HELP_REQUEST_SLA_SECONDS: int = Field(1800, env="HELP_REQUEST_SLA_SECONDS")
+    HELP_REQUEST_SWEEP_INTERVAL_SECONDS: float = Field(30.0, env="HELP_REQUEST_SWEEP_INTERVAL_SECONDS")
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -1,25 +1,83 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
+
+const PAGE_SIZE = 50;
+
+// appends items that are not in the list yet (pages and pushed events can overlap)
+const appendNew = (list: any[], items: any[]) => [
+  ...list,
+  ...items.filter((item) => !list.some((existing) => existing.id === item.id)),
+];
 
 const History = () => {
-  const [history, setHistory] = useState([]);
+  const [history, setHistory] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // events pushed while the first page is loading, applied on top of it
+  const buffered = useRef<((list: any[]) => any[])[] | null>([]);
+
+  const apply = (update: (list: any[]) => any[]) => {
+    if (buffered.current) buffered.current.push(update);
+    else setHistory(update);
+  };
 
   useEffect(() => {
+    // subscribe before the first fetch so nothing falls in between
+    const events = new EventSource("http://127.0.0.1:8000/requests/events");
+
+    events.addEventListener("resolved", (e) => {
+      const item = JSON.parse((e as MessageEvent).data);
+      apply((list) => appendNew([item], list));
+    });
+
+    // the server could not replay everything we missed
+    events.addEventListener("reset", () => fetchHistory());
+
     fetchHistory();
+
+    return () => events.close();
   }, []);
 
-  const fetchHistory = async () => {
+  // pages through resolved requests newest first, `cursor` comes from the previous page
+  const fetchHistory = async (cursor?: string) => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    else buffered.current ??= [];
+
     try {
-      const res = await fetch("http://127.0.0.1:8000/requests/resolved");
+      const res = await fetch(
+        `http://127.0.0.1:8000/requests/resolved?${params.toString()}`
+      );
       const data = await res.json();
-      setHistory(data);
+      if (cursor) {
+        setHistory((prev) => appendNew(prev, data.items));
+      } else {
+        const updates = buffered.current ?? [];
+        buffered.current = null;
+        setHistory(updates.reduce((list, update) => update(list), data.items));
+      }
+      setNextCursor(data.next_cursor);
     } catch (err) {
       console.error("Failed to fetch history", err);
+      if (!cursor) {
+        // keep what was pushed meanwhile, the next reset fetches again
+        const updates = buffered.current ?? [];
+        buffered.current = null;
+        setHistory((prev) => updates.reduce((list, update) => update(list), prev));
+      }
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchHistory(nextCursor);
+    setLoadingMore(false);
+  };
+
   return (
     <div className="p-[20px] w-[80%]">
       <h1 className="text-[32px] font-medium mb-4">Request History</h1>
@@ -72,6 +130,16 @@ const History = () => {
           {history.length === 0 && (
             <p className="text-gray-500 text-lg">No history yet.</p>
           )}
+
+          {nextCursor && (
+            <button
+              className="self-start px-4 py-2 bg-white border border-gray-300 rounded-lg hover:bg-gray-50 disabled:text-gray-400"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       )}
     </div>
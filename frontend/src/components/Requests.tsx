@@ -1,27 +1,96 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import Request from "./Request";
 
+const PAGE_SIZE = 50;
+
+// appends items that are not in the list yet (pages and pushed events can overlap)
+const appendNew = (list: any[], items: any[]) => [
+  ...list,
+  ...items.filter((item) => !list.some((existing) => existing.id === item.id)),
+];
+
 const Requests = () => {
-  const [requests, setRequests] = useState([]);
+  const [requests, setRequests] = useState<any[]>([]);
   const [answers, setAnswers] = useState<{ [key: number]: string }>({});
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // events pushed while the first page is loading, applied on top of it
+  const buffered = useRef<((list: any[]) => any[])[] | null>([]);
+  // the event handlers see the state of the first render, not this
+  const hasMore = useRef(false);
+
+  const apply = (update: (list: any[]) => any[]) => {
+    if (buffered.current) buffered.current.push(update);
+    else setRequests(update);
+  };
 
   useEffect(() => {
+    // subscribe before the first fetch so nothing falls in between
+    const events = new EventSource("http://127.0.0.1:8000/requests/events");
+
+    events.addEventListener("created", (e) => {
+      const item = JSON.parse((e as MessageEvent).data);
+      // the queue is oldest first, a new request comes with the last page
+      apply((list) => (hasMore.current ? list : appendNew(list, [item])));
+    });
+
+    const drop = (e: Event) => {
+      const item = JSON.parse((e as MessageEvent).data);
+      apply((list) => list.filter((req) => req.id !== item.id));
+    };
+    events.addEventListener("resolved", drop);
+    events.addEventListener("timed_out", drop);
+
+    // the server could not replay everything we missed
+    events.addEventListener("reset", () => fetchPending());
+
     fetchPending();
+
+    return () => events.close();
   }, []);
 
-  const fetchPending = async () => {
+  // pages through the queue oldest first, `cursor` comes from the previous page
+  const fetchPending = async (cursor?: string) => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    else buffered.current ??= [];
+
     try {
-      const res = await fetch("http://127.0.0.1:8000/requests/pending");
+      const res = await fetch(
+        `http://127.0.0.1:8000/requests/pending?${params.toString()}`
+      );
       const data = await res.json();
-      setRequests(data);
+      hasMore.current = Boolean(data.next_cursor);
+      if (cursor) {
+        setRequests((prev) => appendNew(prev, data.items));
+      } else {
+        const updates = buffered.current ?? [];
+        buffered.current = null;
+        setRequests(updates.reduce((list, update) => update(list), data.items));
+      }
+      setNextCursor(data.next_cursor);
     } catch (err) {
       console.error("Failed to fetch pending requests", err);
+      if (!cursor) {
+        // keep what was pushed meanwhile, the next reset fetches again
+        const updates = buffered.current ?? [];
+        buffered.current = null;
+        setRequests((prev) => updates.reduce((list, update) => update(list), prev));
+      }
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchPending(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleAnswerChange = (id: number, value: string) => {
     setAnswers((prev) => ({ ...prev, [id]: value }));
   };
@@ -83,6 +152,16 @@ const Requests = () => {
           </div>
         </div>
       )}
+
+      {!loading && nextCursor && (
+        <button
+          className="mt-6 self-start px-4 py-2 bg-white border border-gray-300 rounded-lg hover:bg-gray-50 disabled:text-gray-400"
+          onClick={loadMore}
+          disabled={loadingMore}
+        >
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 };
@@ -0,0 +1,81 @@
+import hashlib
+import importlib
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger("embeddings")
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# The backend embeds KB articles when they are written, the agent embeds
+# queries and compares them with those vectors, so both import this module.
+
+
+class Embedder(ABC):
+    """
+    Turns texts into L2-normalized float32 vectors. `name` is stored next to
+    every article vector, so vectors from a different model are recomputed
+    instead of being compared.
+    """
+
+    name: str = ""
+    dim: int = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic local embedder (feature hashing of words and character
+    trigrams). Needs no model download, so it is the default and is what
+    tests use.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for word in _WORD_RE.findall(text.lower()):
+                self._add(vectors[row], word, 1.0)
+
+                padded = f"#{word}#"
+                for i in range(len(padded) - 2):
+                    self._add(vectors[row], padded[i:i + 3], 0.5)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _add(self, vector: np.ndarray, feature: str, weight: float) -> None:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        sign = 1.0 if value & 1 else -1.0
+        vector[(value >> 1) % self.dim] += sign * weight
+
+
+def load_embedder(spec: str) -> Embedder:
+    """
+    "hashing" / "hashing-<dim>" for the built-in embedder, or
+    "package.module:factory" for anything else returning an Embedder.
+    """
+    if spec.startswith("hashing"):
+        _, _, dim = spec.partition("-")
+        return HashingEmbedder(int(dim) if dim else 256)
+
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    embedder = factory()
+    logger.info(f"Loaded embedder {embedder.name} ({embedder.dim} dims)")
+    return embedder
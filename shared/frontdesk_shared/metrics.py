@@ -0,0 +1,31 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger("metrics")
+
+
+# Buckets of the latency histograms of the backend and the agent, one scale
+# so their dashboards line up. 1ms .. 10s, covers a cached KB hit up to a
+# slow LLM turn.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@contextmanager
+def span(histogram: Histogram, **labels) -> Iterator[None]:
+    """
+    Times the block into `histogram`, labelled with `labels` if it has any.
+    The duration is also logged at DEBUG with the labels, which is the
+    per-call trace when debugging a slow request or turn.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        (histogram.labels(**labels) if labels else histogram).observe(elapsed)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"span {histogram.describe()[0].name} {labels} {elapsed * 1000:.1f}ms")
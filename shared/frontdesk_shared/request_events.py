@@ -0,0 +1,37 @@
+import json
+from typing import Any, Mapping
+
+# Append-only log of help request changes, read by the dashboard's SSE
+# connections. The agent adds `created` events, the backend `resolved` and
+# `timed_out` ones. A stream rather than plain pub/sub so a reconnecting
+# client can resume from the last event ID it saw.
+HELP_REQUEST_EVENTS_STREAM = "help_request_events"
+HELP_REQUEST_EVENTS_MAXLEN = 10000
+
+# what the dashboard gets of a help request, whichever side sent it
+HELP_REQUEST_EVENT_FIELDS = (
+    "id",
+    "business_id",
+    "customer_id",
+    "question",
+    "status",
+    "supervisor_answer",
+    "created_at",
+    "answered_at",
+)
+
+
+def request_event_fields(event_type: str, help_request: Mapping[str, Any]) -> dict:
+    """The stream entry for `help_request`, given as JSON-ready values."""
+    payload = {name: help_request.get(name) for name in HELP_REQUEST_EVENT_FIELDS}
+    return {"type": event_type, "data": json.dumps(payload)}
+
+
+def add_request_event(redis_client, event_type: str, help_request: Mapping[str, Any]):
+    """XADDs the event, on a client (awaitable) or a pipeline (queued)."""
+    return redis_client.xadd(
+        HELP_REQUEST_EVENTS_STREAM,
+        request_event_fields(event_type, help_request),
+        maxlen=HELP_REQUEST_EVENTS_MAXLEN,
+        approximate=True,
+    )
@@ -0,0 +1,8 @@
+# Words ignored when comparing KB questions, by the agent's KB index and the
+# backend's near-duplicate detection alike.
+STOP_WORDS = frozenset({
+    'the', 'is', 'are', 'was', 'were', 'a', 'an', 'and', 'or', 'but',
+    'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from',
+    'what', 'when', 'where', 'who', 'how', 'do', 'does', 'can',
+    'could', 'would', 'should', 'your', 'my', 'our', 'their'
+})